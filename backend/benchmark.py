@@ -0,0 +1,376 @@
+"""End-to-end benchmark: replays the bundled recordings against a local server and a fake LLM.
+
+Starts a deterministic OpenAI-compatible LLM stand-in and the app (uvicorn subprocess), runs N
+WebSocket sessions and /process-transcript calls concurrently, and prints per-stage latency
+percentiles, Whisper real-time factor, server peak RSS and throughput as JSON.
+
+    python benchmark.py --sessions 8 --concurrency 4 --llm-latency 2 --output run.json
+
+Needs the backend requirements plus `websockets`.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import av
+import httpx
+import uvicorn
+import websockets
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORDINGS = sorted(glob.glob(os.path.join(BACKEND_DIR, "temp_*.webm")))
+PARTICIPANTS = [
+    {"name": "Alice", "email": "alice@example.com"},
+    {"name": "Bob", "email": "bob@example.com"},
+]
+SAMPLE_TRANSCRIPT = (
+    "Okay let's get started. Alice will send the revised budget to finance by Friday. "
+    "Bob is going to review the onboarding flow and report back next week. "
+    "We agreed to move the launch to the second week of March. "
+) * 20
+
+# Deterministic reply that satisfies the single-call, chunk and reduce prompts.
+# Every participant gets a task so the email stage is exercised too.
+FAKE_LLM_REPLY = json.dumps({
+    "meeting_summary": "The team reviewed the budget, onboarding and launch timing.",
+    "summary_points": ["Budget revision due Friday", "Launch moved to March"],
+    "tasks": [{"task": "Send the revised budget", "owner": "Alice", "deadline": "Friday"}],
+    "participants": [
+        {**p, "tasks": [{"task": f"Follow up on item {i + 1}", "deadline": None}]}
+        for i, p in enumerate(PARTICIPANTS)
+    ],
+})
+
+
+def create_fake_llm(latency: float) -> FastAPI:
+    """OpenAI-compatible chat completions that answer FAKE_LLM_REPLY after `latency` seconds."""
+    fake = FastAPI()
+
+    @fake.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "benchmark"}]}
+
+    # Ollama's native endpoints used by the server's warm-up and keep-alive
+    @fake.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": f"{os.getenv('OLLAMA_MODEL', 'llama3.1')}:latest"}]}
+
+    @fake.post("/api/generate")
+    async def generate():
+        return {"done": True}
+
+    @fake.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+        completion = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": FAKE_LLM_REPLY},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(FAKE_LLM_REPLY) // 4,
+                "total_tokens": prompt_tokens + len(FAKE_LLM_REPLY) // 4,
+            },
+        }
+        if not body.get("stream"):
+            return JSONResponse(completion)
+
+        async def events():
+            # A handful of deltas so streaming consumers see partial output
+            step = max(1, len(FAKE_LLM_REPLY) // 8)
+            for i in range(0, len(FAKE_LLM_REPLY), step):
+                delta = {**completion, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {"content": FAKE_LLM_REPLY[i:i + step]}, "finish_reason": None}
+                ]}
+                delta.pop("usage")
+                yield f"data: {json.dumps(delta)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**completion, 'object': 'chat.completion.chunk', 'choices': []})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return fake
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_llm(port: int, latency: float) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(create_fake_llm(latency), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    return server
+
+
+def start_app(port: int, llm_ports: List[int], workdir: str, extra_env: Dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OLLAMA_BASE_URLS": ",".join(f"http://127.0.0.1:{p}/v1" for p in llm_ports),
+        "EMAIL_TRANSPORT": "file",
+        "EMAIL_OUTBOX_DIR": os.path.join(workdir, "outbox"),
+        "CACHE_ENABLED": "false",  # Measure real work, not cache hits
+        "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "SESSION_DB_PATH": os.path.join(workdir, "sessions.sqlite3"),
+        **extra_env,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+
+async def wait_until_up(base_url: str, timeout: float = 300.0):
+    """Waits for the server to answer and finish its warm-up, so runs measure warm latency."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                response = await http.get(f"{base_url}/health")
+                if response.status_code == 200 and response.json().get("warm", True):
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not come up within {timeout}s")
+
+
+def audio_seconds(path: str) -> float:
+    """Duration by decoding: MediaRecorder WebM files usually carry no duration header."""
+    samples = 0.0
+    with av.open(path) as container:
+        for frame in container.decode(audio=0):
+            samples += frame.samples / frame.sample_rate
+    return samples
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+async def wait_for_email(http: httpx.AsyncClient, base_url: str, dispatch_id: Optional[str], timeout: float = 60.0) -> Optional[float]:
+    if not dispatch_id:
+        return None
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        statuses = (await http.get(f"{base_url}/email-status/{dispatch_id}")).json()["participants"]
+        if all(state in ("sent", "failed") for state in statuses.values()):
+            return time.perf_counter() - start
+        await asyncio.sleep(0.05)
+    return None
+
+
+async def run_session(base_url: str, path: str, args, http: httpx.AsyncClient) -> Dict:
+    """One recording over the WebSocket. Stage times come from the server's stage messages."""
+    ws_url = base_url.replace("http", "ws", 1) + f"/ws/record/{uuid.uuid4()}"
+    timings: Dict[str, float] = {}
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "metadata", "title": "Benchmark", "participants": PARTICIPANTS}))
+
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            seq = 0
+            while data := f.read(args.chunk_bytes):
+                seq += 1
+                await ws.send(json.dumps({"type": "chunk_seq", "seq": seq}))
+                await ws.send(data)
+                if args.pace:
+                    await asyncio.sleep(args.pace)
+        timings["ingest"] = time.perf_counter() - start
+
+        await ws.send(json.dumps({"type": "stop"}))
+        stage_start = time.perf_counter()
+        result = None
+        while True:
+            msg = json.loads(await ws.recv())
+            stage = msg.get("stage")
+            if stage == "analyzing":
+                timings["transcribe"] = time.perf_counter() - stage_start
+                stage_start = time.perf_counter()
+            elif stage == "complete":
+                timings["analyze"] = time.perf_counter() - stage_start
+                result = msg["result"]
+                break
+            elif stage == "error":
+                raise RuntimeError(msg.get("message"))
+
+    email = await wait_for_email(http, base_url, result.get("email_dispatch_id"))
+    if email is not None:
+        timings["email"] = email
+    return timings
+
+
+async def run_transcript_call(base_url: str, http: httpx.AsyncClient) -> Dict:
+    start = time.perf_counter()
+    resp = await http.post(f"{base_url}/process-transcript", json={
+        "transcript": SAMPLE_TRANSCRIPT,
+        "participants": PARTICIPANTS,
+    })
+    resp.raise_for_status()
+    timings = {"process_transcript": time.perf_counter() - start}
+    email = await wait_for_email(http, base_url, resp.json().get("email_dispatch_id"))
+    if email is not None:
+        timings["email"] = email
+    return timings
+
+
+async def run_benchmark(args, base_url: str) -> Dict:
+    durations = {path: audio_seconds(path) for path in RECORDINGS}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    stages: Dict[str, List[float]] = {}
+    rtf: List[float] = []
+    errors: List[str] = []
+
+    async def guarded(job):
+        async with semaphore:
+            try:
+                return await job
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                return None
+
+    async with httpx.AsyncClient(timeout=None) as http:
+        jobs = [run_session(base_url, RECORDINGS[i % len(RECORDINGS)], args, http) for i in range(args.sessions)]
+        jobs += [run_transcript_call(base_url, http) for _ in range(args.transcript_calls)]
+        paths = [RECORDINGS[i % len(RECORDINGS)] for i in range(args.sessions)]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(guarded(job) for job in jobs))
+        elapsed = time.perf_counter() - start
+
+    for i, timings in enumerate(results):
+        if timings is None:
+            continue
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+        if i < len(paths) and "transcribe" in timings:
+            rtf.append(timings["transcribe"] / durations[paths[i]])
+
+    completed_sessions = sum(1 for r in results[:len(paths)] if r is not None)
+    return {
+        "stages": {stage: summarize(values) for stage, values in sorted(stages.items())},
+        "whisper_rtf": summarize(rtf),
+        "throughput": {
+            "wall_seconds": elapsed,
+            "sessions_per_second": completed_sessions / elapsed,
+            "audio_seconds_per_second": sum(durations[p] for p, r in zip(paths, results) if r is not None) / elapsed,
+            "requests_per_second": sum(1 for r in results if r is not None) / elapsed,
+        },
+        "errors": errors,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4, help="WebSocket recording sessions to replay")
+    parser.add_argument("--transcript-calls", type=int, default=4, help="/process-transcript calls")
+    parser.add_argument("--concurrency", type=int, default=4, help="Sessions and calls in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Seconds the fake LLM takes per completion")
+    parser.add_argument("--llm-backends", type=int, default=1, help="Fake LLM servers for the app to balance across")
+    parser.add_argument("--chunk-bytes", type=int, default=16 * 1024, help="Bytes per WebSocket audio frame")
+    parser.add_argument("--pace", type=float, default=0.0, help="Seconds between audio frames (0 = as fast as possible)")
+    parser.add_argument("--server-url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra server environment")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if not RECORDINGS:
+        sys.exit(f"No temp_*.webm recordings found in {BACKEND_DIR}")
+
+    app_process = None
+    llm_servers = []
+    with tempfile.TemporaryDirectory(prefix="meeting-bench-") as workdir:
+        if args.server_url:
+            base_url = args.server_url.rstrip("/")
+        else:
+            llm_ports = [free_port() for _ in range(args.llm_backends)]
+            llm_servers = [start_fake_llm(port, args.llm_latency) for port in llm_ports]
+            app_port = free_port()
+            app_process = start_app(app_port, llm_ports, workdir, dict(e.split("=", 1) for e in args.env))
+            base_url = f"http://127.0.0.1:{app_port}"
+        try:
+            asyncio.run(wait_until_up(base_url))
+            report = asyncio.run(run_benchmark(args, base_url))
+            report["peak_rss_mb"] = peak_rss_mb(app_process.pid) if app_process else None
+        finally:
+            if app_process:
+                app_process.terminate()
+                app_process.wait(timeout=30)
+            for server in llm_servers:
+                server.should_exit = True
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "recordings": [os.path.basename(p) for p in RECORDINGS],
+        **report,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,511 +1,3386 @@
-import os
-import json
-import uuid
-import logging
-import contextlib
-import gc
-import shutil
-import time
-import asyncio
-from typing import List, Optional, Dict
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, Body
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
-from openai import OpenAI
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-from dotenv import load_dotenv
-
-# Force CPU mode for CTranslate2/faster-whisper to avoid CUDA library requirements
-os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
-os.environ["CT2_CUDA_ALLOCATOR"] = "none"
-
-load_dotenv()
-
-# Logging configuration
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-app = FastAPI(title="AI Meeting Assistant API (Ollama Only)")
-
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# LLM Configuration (Ollama Only)
-OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
-OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
-USE_OLLAMA = True # Forced
-
-# Initialize OpenAI-compatible client for Ollama
-client = OpenAI(
-    base_url=OLLAMA_BASE_URL,
-    api_key="ollama" 
-)
-logger.info(f"Using Ollama local LLM: {OLLAMA_MODEL}")
-
-# Initialize local Whisper
-try:
-    from faster_whisper import WhisperModel
-    # Use 'base' model for speed/accuracy balance on CPU
-    # Force CPU mode to avoid CUDA library requirements
-    whisper_model = WhisperModel("base", device="cpu", compute_type="int8")
-    logger.info("Loaded local Whisper model (base) on CPU")
-except ImportError:
-    logger.critical("faster-whisper not installed. Please run: pip install faster-whisper")
-    whisper_model = None
-    raise RuntimeError("faster-whisper is required for this configuration.")
-
-sg = SendGridAPIClient(os.getenv("SENDGRID_API_KEY")) if os.getenv("SENDGRID_API_KEY") else None
-
-# Models
-class Task(BaseModel):
-    task: str
-    deadline: Optional[str] = None
-
-class Participant(BaseModel):
-    name: str
-    email: EmailStr
-    tasks: List[Task] = []
-
-class ProcessingResult(BaseModel):
-    meeting_summary: str
-    transcript: str
-    participants: List[Participant]
-
-class ParticipantInput(BaseModel):
-    name: str
-    email: EmailStr
-
-class TranscriptProcessRequest(BaseModel):
-    transcript: str
-    participants: List[ParticipantInput]
-    meeting_title: Optional[str] = None
-
-# System Prompt
-SYSTEM_PROMPT = """You are a privacy-first AI meeting assistant.
-
-Your role:
-- Analyze a meeting transcript up to 45 minutes long
-- Generate a concise Notion-style meeting summary
-- Extract action items
-- Assign tasks to participants
-- Prepare structured data for email notifications
-- Do NOT store or reference past meetings
-
-TRANSCRIPT HANDLING RULES:
-If input is from live audio (Whisper output):
-- Expect filler words ("um", "uh", "like") and verbal timestamps
-- Clean filler words during extraction but preserve semantic meaning
-- Speaker diarization is unavailable; assume single stream or use paragraph breaks as speaker changes
-- If provided with microphone mute events, insert [Microphone Muted] and [Microphone Unmuted] markers in the transcript at the appropriate time-based locations
-- When microphone is muted, only system audio (other participants) was captured
-
-If input is raw pasted text:
-- Assume text is pre-edited (cleaner grammar)
-- Look for markdown headers or bullet points that indicate agenda structure
-- If text contains "Speaker Name:" prefixes, parse and preserve attribution
-
-Rules:
-- Do NOT invent tasks, decisions, or deadlines
-- Be conservative in task extraction
-- If task ownership is unclear, mark as 'Unassigned'
-- IMPORTANT: You will receive a participants list. You MUST return the SAME participants in your output
-- Each participant MUST have both "name" and "email" fields (never null or empty)
-- If a participant has no tasks, return an empty tasks array []
-- Output JSON only
-
-Output schema:
-{
-  "meeting_summary": "string",
-  "participants": [
-    {
-      "name": "string (required, never null)",
-      "email": "string (required, never null)",
-      "tasks": [
-        {
-          "task": "string",
-          "deadline": "string or null"
-        }
-      ]
-    }
-  ]
-}
-
-CRITICAL: Return ALL participants from the input list, even if they have no tasks.
-"""
-
-@app.get("/health")
-async def health():
-    return {"status": "healthy", "llm": "ollama", "whisper": "faster-whisper"}
-
-@app.post("/test-email")
-async def test_email(email: EmailStr):
-    if not sg:
-        raise HTTPException(status_code=500, detail="SendGrid not configured")
-    
-    message = Mail(
-        from_email=os.getenv("FROM_EMAIL"),
-        to_emails=email,
-        subject='Test Email from AI Meeting Assistant',
-        plain_text_content='If you receive this, your email configuration is working correctly.'
-    )
-    try:
-        sg.send(message)
-        return {"status": "sent"}
-    except Exception as e:
-        logger.error(f"Email failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-async def transcribe_audio(file: UploadFile):
-    """Transcribes audio using local Faster Whisper."""
-    try:
-        # Temporary save for API call, then delete
-        temp_filename = f"temp_{file.filename}"
-        with open(temp_filename, "wb") as buffer:
-            chunk_size = 1024 * 1024 # 1MB chunks
-            while content := await file.read(chunk_size):
-                buffer.write(content)
-        
-        with open(temp_filename, "rb") as audio_file:
-            if whisper_model:
-                segments, info = whisper_model.transcribe(temp_filename, beam_size=5)
-                transcript_text = " ".join([segment.text for segment in segments])
-            else:
-                 raise RuntimeError("Whisper model not initialized")
-        
-        # Immediate deletion
-        if os.path.exists(temp_filename):
-            os.remove(temp_filename)
-        return transcript_text
-    except Exception as e:
-        if os.path.exists(temp_filename):
-            os.remove(temp_filename)
-        logger.error(f"Transcription failed: {e}")
-        raise HTTPException(status_code=500, detail="Transcription failed")
-
-def send_participant_email(participant: Participant, summary: str):
-    """Sends personalized email to participant."""
-    if not sg or not participant.tasks:
-        return
-    
-    tasks_html = "<ul>" + "".join([f"<li>{t.task} (Deadline: {t.deadline or 'N/A'})</li>" for t in participant.tasks]) + "</ul>"
-    
-    email_body = f"""
-    Hi {participant.name},<br><br>
-    Here’s a summary of the meeting:<br>
-    {summary}<br><br>
-    Your action items:<br>
-    {tasks_html}<br><br>
-    Thanks!
-    """
-    
-    message = Mail(
-        from_email=os.getenv("FROM_EMAIL"),
-        to_emails=participant.email,
-        subject='Your action items from today’s meeting',
-        html_content=email_body
-    )
-    try:
-        sg.send(message)
-    except Exception as e:
-        logger.error(f"Failed to send email to {participant.email}: {e}")
-
-class MutingEvent(BaseModel):
-    timestamp: int
-    muted: bool
-
-class MeetingSession:
-    def __init__(self, session_id: str):
-        self.session_id = session_id
-        self.file_path = f"temp_{session_id}.webm"
-        self.participants = []
-        self.title = "Live Meeting"
-        self.bytes_received = 0
-        self.max_bytes = 100 * 1024 * 1024 # 100MB
-        self.last_activity = time.time()
-        self.is_finalized = False
-        self.lock = asyncio.Lock()
-        self.mute_events: List[Dict] = []  # Track mute/unmute events
-        self.chunk_sequence: List[int] = []  # Track received chunk sequence numbers
-        self.is_recording = False  # Track if actively recording
-
-    def cleanup(self):
-        if os.path.exists(self.file_path):
-            try:
-                os.remove(self.file_path)
-                logger.info(f"Cleaned up session file: {self.file_path}")
-            except Exception as e:
-                logger.error(f"Cleanup failed for {self.file_path}: {e}")
-
-class SessionManager:
-    def __init__(self):
-        self.sessions: Dict[str, MeetingSession] = {}
-
-    def get_or_create(self, session_id: str) -> MeetingSession:
-        if session_id not in self.sessions:
-            self.sessions[session_id] = MeetingSession(session_id)
-        return self.sessions[session_id]
-
-    async def cleanup_loop(self):
-        while True:
-            await asyncio.sleep(60)
-            now = time.time()
-            to_delete = []
-            for sid, sess in self.sessions.items():
-                # 10 minutes timeout for active recording, 5 minutes for inactive
-                timeout = 600 if sess.is_recording else 300
-                if now - sess.last_activity > timeout:
-                    to_delete.append(sid)
-            for sid in to_delete:
-                logger.info(f"Purging stale session: {sid}")
-                self.sessions[sid].cleanup()
-                del self.sessions[sid]
-
-session_manager = SessionManager()
-
-@app.on_event("startup")
-async def startup_event():
-    asyncio.create_task(session_manager.cleanup_loop())
-
-@contextlib.asynccontextmanager
-async def secure_temp_file(suffix: str = ".webm"):
-    """Context manager for secure temporary files with auto-cleanup."""
-    file_id = uuid.uuid4()
-    path = f"temp_{file_id}{suffix}"
-    try:
-        yield path
-    finally:
-        if os.path.exists(path):
-            try:
-                os.remove(path)
-                logger.info(f"Cleaned up temp file: {path}")
-            except Exception as e:
-                logger.error(f"Failed to delete temp file {path}: {e}")
-
-def chunk_transcript(text: str, chunk_size: int = 30000, overlap: int = 500) -> List[str]:
-    """Chunks transcript for LLM analysis if it exceeds limit."""
-    if len(text) <= chunk_size:
-        return [text]
-    
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start = end - overlap
-    return chunks
-
-async def analyze_transcript(transcript: str, participants_json: str, mute_events: List[Dict] = None) -> ProcessingResult:
-    """Core analysis logic using LLM."""
-    chunks = chunk_transcript(transcript)
-
-    # Simple map-reduce: for now we just process the first chunk if it's too long,
-    # or implement full map-reduce if needed. Given the 45m limit, 100k chars is a good limit.
-    # For this implementation, we'll focus on the primary chunk or first 100k chars.
-    full_text = transcript[:100000] # Cap at 100k chars for privacy/safety
-
-    # Add mute events context if available
-    mute_context = ""
-    if mute_events and len(mute_events) > 0:
-        mute_context = "\n\nMicrophone Mute Events (timestamps in milliseconds since epoch):\n"
-        for event in mute_events:
-            mute_context += f"- {event['timestamp']}: Microphone {'MUTED' if event['muted'] else 'UNMUTED'}\n"
-        mute_context += "\nNote: When the microphone was muted, only system audio was captured. Insert [Microphone Muted] and [Microphone Unmuted] markers in the transcript at appropriate locations based on these timestamps.\n"
-
-    response = client.chat.completions.create(
-        model=OLLAMA_MODEL,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"Participants list: {participants_json}{mute_context}\n\nTranscript:\n{full_text}"}
-        ],
-        response_format={"type": "json_object"}
-    )
-    
-    content = response.choices[0].message.content
-    try:
-        result_json = json.loads(content)
-    except json.JSONDecodeError:
-        # Fallback if model outputs text with markdown block
-        logger.warning(f"JSON Decode failed, attempting cleanup. Content: {content[:100]}...")
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-            result_json = json.loads(content)
-        else:
-            raise HTTPException(status_code=500, detail="LLM failed to produce valid JSON")
-
-    # Validate and clean participant data
-    input_participants = json.loads(participants_json)
-    cleaned_participants = []
-
-    for p in result_json.get("participants", []):
-        # Skip participants with null/None values
-        if not p.get("name") or not p.get("email"):
-            logger.warning(f"Skipping participant with missing data: {p}")
-            continue
-
-        # Ensure tasks is a list
-        if "tasks" not in p or p["tasks"] is None:
-            p["tasks"] = []
-
-        cleaned_participants.append(p)
-
-    # If no valid participants from LLM, use input participants with empty tasks
-    if not cleaned_participants and input_participants:
-        logger.warning("LLM returned no valid participants. Using input participants with empty tasks.")
-        cleaned_participants = [
-            {
-                "name": p.get("name", "Unknown"),
-                "email": p.get("email", "unknown@example.com"),
-                "tasks": []
-            }
-            for p in input_participants
-            if p.get("email")  # Only include if email exists
-        ]
-
-    result_json["participants"] = cleaned_participants
-    result_json["transcript"] = transcript  # Add the full transcript to the result
-
-    try:
-        result = ProcessingResult(**result_json)
-    except Exception as e:
-        logger.error(f"Failed to validate ProcessingResult: {e}")
-        logger.error(f"Result JSON: {json.dumps(result_json, indent=2)}")
-        # Fallback: return empty result with summary
-        result = ProcessingResult(
-            meeting_summary=result_json.get("meeting_summary", "Meeting summary unavailable."),
-            transcript=transcript,
-            participants=[
-                Participant(name=p["name"], email=p["email"], tasks=p.get("tasks", []))
-                for p in cleaned_participants
-            ]
-        )
-
-    # Email cleanup/memory management
-    del full_text
-    gc.collect()
-
-    return result
-
-@app.websocket("/ws/record/{session_id}")
-async def websocket_record(websocket: WebSocket, session_id: str):
-    await websocket.accept()
-    sess = session_manager.get_or_create(session_id)
-    logger.info(f"WebSocket connected for session: {session_id}")
-    
-    try:
-        while True:
-            data = await websocket.receive()
-            sess.last_activity = time.time()
-            
-            if "bytes" in data:
-                chunk = data["bytes"]
-                async with sess.lock:
-                    if sess.bytes_received + len(chunk) > sess.max_bytes:
-                        await websocket.send_json({"stage": "error", "message": "Size limit exceeded (100MB)"})
-                        break
-                    
-                    # Leak Prevention: Basic check for silence/empty chunk
-                    if len(chunk) < 10: # Minimum headers
-                        continue
-                        
-                    with open(sess.file_path, "ab") as f:
-                        f.write(chunk)
-                    
-                    sess.bytes_received += len(chunk)
-            
-            elif "text" in data:
-                payload = json.loads(data["text"])
-                if payload.get("type") == "metadata":
-                    sess.participants = payload.get("participants", [])
-                    sess.title = payload.get("title", sess.title)
-                    sess.is_recording = True  # Mark session as actively recording
-                    logger.info(f"Session {session_id} metadata received. Recording started.")
-                elif payload.get("type") == "chunk_seq":
-                    seq = payload.get("seq")
-                    if seq is not None:
-                        sess.chunk_sequence.append(seq)
-                        # Detect missing chunks
-                        if len(sess.chunk_sequence) > 1:
-                            expected = sess.chunk_sequence[-2] + 1
-                            if seq != expected:
-                                logger.warning(f"Session {session_id}: Missing chunks detected. Expected {expected}, got {seq}")
-                elif payload.get("type") == "mute_event":
-                    mute_event = {
-                        "timestamp": payload.get("timestamp"),
-                        "muted": payload.get("muted")
-                    }
-                    sess.mute_events.append(mute_event)
-                    logger.info(f"Session {session_id}: Microphone {'muted' if mute_event['muted'] else 'unmuted'} at {mute_event['timestamp']}")
-                elif payload.get("type") == "stop":
-                    # Transcription
-                    await websocket.send_json({"stage": "transcribing"})
-                    
-                    if not os.path.exists(sess.file_path) or sess.bytes_received == 0:
-                        await websocket.send_json({"stage": "error", "message": "No audio captured"})
-                        break
-
-                    # Transcription with local whisper
-                    with open(sess.file_path, "rb") as audio_file:
-                        if whisper_model:
-                             # faster-whisper accepts file path
-                            segments, info = whisper_model.transcribe(sess.file_path, beam_size=5)
-                            transcript = " ".join([segment.text for segment in segments])
-                        else:
-                             raise RuntimeError("Whisper model not initialized")
-                    
-                    # Analysis
-                    await websocket.send_json({"stage": "analyzing"})
-                    result = await analyze_transcript(
-                        transcript,
-                        json.dumps(sess.participants),
-                        mute_events=sess.mute_events
-                    )
-
-                    # Emailing
-                    participant_emails = {p['email'] for p in sess.participants}
-                    for p_result in result.participants:
-                        if p_result.email in participant_emails and p_result.tasks:
-                            send_participant_email(p_result, result.meeting_summary)
-
-                    await websocket.send_json({"stage": "complete", "result": result.model_dump()})
-                    sess.is_finalized = True
-                    sess.is_recording = False  # Mark recording as complete
-                    break
-                
-    except Exception as e:
-        logger.error(f"WebSocket error for {session_id}: {e}")
-        try:
-            await websocket.send_json({"stage": "error", "message": str(e)})
-        except: pass
-    finally:
-        if sess.is_finalized:
-            sess.cleanup()
-            if session_id in session_manager.sessions:
-                del session_manager.sessions[session_id]
-        # Otherwise, keep session for 60s for possible reconnect
-        await websocket.close()
-
-@app.post("/process-transcript", response_model=ProcessingResult)
-async def process_transcript(req: TranscriptProcessRequest):
-    try:
-        result = await analyze_transcript(req.transcript, json.dumps([p.dict() for p in req.participants]))
-        
-        # Emailing
-        participant_emails = {p.email for p in req.participants}
-        for p_result in result.participants:
-            if p_result.email in participant_emails and p_result.tasks:
-                send_participant_email(p_result, result.meeting_summary)
-        
-        return result
-    except Exception as e:
-        logger.error(f"Transcript processing failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+import os
+import json
+import uuid
+import logging
+import contextlib
+import gc
+import shutil
+import smtplib
+import time
+import asyncio
+import bisect
+import functools
+import hashlib
+import heapq
+import io
+import re
+import sqlite3
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Tuple, BinaryIO, Iterable, Iterator, Callable, Type
+import httpx
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect, Body
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, EmailStr, ValidationError
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail, To
+from email.message import EmailMessage
+from dotenv import load_dotenv
+import numpy as np
+import tiktoken
+
+# Force CPU mode for CTranslate2/faster-whisper to avoid CUDA library requirements
+os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+os.environ["CT2_CUDA_ALLOCATOR"] = "none"
+
+load_dotenv()
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="AI Meeting Assistant API (Ollama Only)")
+
+# CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Metrics, exposed in Prometheus text format on /metrics
+METRICS: List["Metric"] = []
+
+class Metric:
+    """A metric family; one sample (or histogram) per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _format(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._format(key)} {value}" for key, value in self.values.items()]
+
+class Gauge(Counter):
+    """Set directly, moved with inc/dec, or read from `fn` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), fn=None):
+        super().__init__(name, help, labels)
+        self.fn = fn
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        if self.fn is not None:
+            return [f"{self.name} {float(self.fn())}"]
+        return super().samples()
+
+class Histogram(Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values: Dict[Tuple[str, ...], List] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, state in self.values.items():
+                for bound, count in zip(self.buckets, state):
+                    lines.append(f"{self.name}_bucket{self._format(key, (('le', str(bound)),))} {count}")
+                lines.append(f"{self.name}_bucket{self._format(key, (('le', '+Inf'),))} {state[-1]}")
+                lines.append(f"{self.name}_sum{self._format(key)} {state[-2]}")
+                lines.append(f"{self.name}_count{self._format(key)} {state[-1]}")
+        return lines
+
+INGEST_BYTES = Counter("meeting_ingest_bytes_total", "Audio bytes received", ("source",))
+UPLOAD_INGEST_SECONDS = Histogram("meeting_upload_ingest_seconds", "Time to buffer an uploaded audio file")
+DECODE_SECONDS = Histogram("meeting_audio_decode_seconds", "Full decode of buffered audio to 16 kHz PCM")
+STREAM_DECODE_FAILURES = Counter("meeting_stream_decode_failures_total", "Sessions whose streaming decoder gave up")
+TRANSCRIBE_SECONDS = Histogram("meeting_transcribe_seconds", "Whisper inference time per call", ("mode",))
+TRANSCRIBE_AUDIO_SECONDS = Counter("meeting_transcribe_audio_seconds_total", "Seconds of audio passed to Whisper", ("mode",))
+TRANSCRIBE_RTF = Histogram(
+    "meeting_transcribe_realtime_factor", "Whisper inference time divided by audio duration", ("mode",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+)
+LLM_REQUEST_SECONDS = Histogram("meeting_llm_request_seconds", "LLM chat completion time", ("outcome",))
+LLM_TTFT_SECONDS = Histogram("meeting_llm_time_to_first_token_seconds", "Time until the LLM streams its first token")
+LLM_TOKENS = Counter("meeting_llm_tokens_total", "Tokens reported by the LLM backend", ("kind",))
+LLM_IN_FLIGHT = Gauge("meeting_llm_requests_in_flight", "LLM calls holding a concurrency slot")
+LLM_CASCADE = Counter("meeting_llm_cascade_total", "Analysis model routing decisions", ("decision",))
+LLM_ESCALATIONS = Counter("meeting_llm_escalations_total", "Small-model analyses redone by the large model", ("reason",))
+LLM_FAILOVERS = Counter("meeting_llm_failovers_total", "LLM calls moved to another backend", ("backend",))
+LLM_JSON_REPAIRS = Counter("meeting_llm_json_repairs_total", "LLM replies that were not plain JSON", ("outcome",))
+EMAILS = Counter("meeting_emails_total", "Participant emails by delivery outcome", ("outcome",))
+EMAIL_SEND_SECONDS = Histogram("meeting_email_send_seconds", "Time to send one email batch")
+STAGE_SECONDS = Histogram("meeting_stage_seconds", "Pipeline stage latency, cache hits excluded", ("stage",))
+
+# LLM Configuration (Ollama Only)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+# Comma-separated OpenAI-compatible endpoints of several Ollama servers; defaults to OLLAMA_BASE_URL
+OLLAMA_BASE_URLS = [u.strip().rstrip("/") for u in os.getenv("OLLAMA_BASE_URLS", OLLAMA_BASE_URL).split(",") if u.strip()]
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
+# Optional small, fast model for short and simple transcripts; unset disables the cascade
+OLLAMA_SMALL_MODEL = os.getenv("OLLAMA_SMALL_MODEL", "")
+CASCADE_MAX_TOKENS = int(os.getenv("CASCADE_MAX_TOKENS", "2500"))  # Longer transcripts go straight to OLLAMA_MODEL
+CASCADE_MAX_PARTICIPANTS = int(os.getenv("CASCADE_MAX_PARTICIPANTS", "4"))
+USE_OLLAMA = True # Forced
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))  # Parallel generations each Ollama server can serve
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "300"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"  # json_schema response_format
+LLM_EJECT_AFTER_FAILURES = int(os.getenv("LLM_EJECT_AFTER_FAILURES", "2"))  # Consecutive failures before a backend is ejected
+LLM_PROBE_INTERVAL_SECONDS = float(os.getenv("LLM_PROBE_INTERVAL_SECONDS", "10"))  # Re-probe period for ejected backends
+LLM_LATENCY_EWMA_ALPHA = 0.3
+LLM_RETRY_ROUNDS = int(os.getenv("LLM_RETRY_ROUNDS", "2"))  # Extra passes over all backends once each has failed
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.5"))  # Doubles every round
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")  # Ollama keep_alive for our models
+# Under Ollama's 5-minute default, which any request not carrying keep_alive resets the model to
+LLM_KEEP_ALIVE_INTERVAL_SECONDS = float(os.getenv("LLM_KEEP_ALIVE_INTERVAL_SECONDS", "240"))
+
+# Shared keep-alive connection pool for all LLM calls
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=LLM_MAX_CONCURRENCY * 2 * len(OLLAMA_BASE_URLS),
+        max_keepalive_connections=LLM_MAX_CONCURRENCY * len(OLLAMA_BASE_URLS),
+        keepalive_expiry=300
+    ),
+    timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+)
+
+# Errors that say nothing about the request itself, so another backend may well succeed
+LLM_RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, httpx.TransportError)
+
+class LlmBackend:
+    """One Ollama server: its own client and concurrency slots, plus load and health bookkeeping."""
+
+    def __init__(self, base_url: str, max_concurrency: int):
+        self.base_url = base_url
+        # The router fails over to another backend instead of retrying here
+        self.client = AsyncOpenAI(base_url=base_url, api_key="ollama", http_client=http_client, max_retries=0)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.outstanding = 0  # Requests routed here and not finished, queued ones included
+        self.latency: Optional[float] = None  # EWMA of request seconds
+        self.failures = 0  # Consecutive
+        self.ejected = False
+
+    def score(self) -> float:
+        # Outstanding work weighted by how fast this backend has been; unknown backends look fast
+        return (self.outstanding + 1) * (self.latency or 0.0)
+
+    async def acquire(self, can_fail_over: Callable[[], bool]) -> bool:
+        """Waits for a slot; gives up (False) if the backend is ejected meanwhile and `can_fail_over()`."""
+        while True:
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=1.0)
+                return True
+            except asyncio.TimeoutError:
+                if self.ejected and can_fail_over():
+                    return False
+
+    def record_success(self, seconds: float):
+        self.failures = 0
+        self.ejected = False
+        self.latency = seconds if self.latency is None else (
+            LLM_LATENCY_EWMA_ALPHA * seconds + (1 - LLM_LATENCY_EWMA_ALPHA) * self.latency
+        )
+
+    def record_failure(self, error: Exception):
+        self.failures += 1
+        if self.failures >= LLM_EJECT_AFTER_FAILURES and not self.ejected:
+            self.ejected = True
+            logger.warning(f"Ejecting LLM backend {self.base_url} after {self.failures} failures: {error}")
+
+    async def probe(self) -> bool:
+        try:
+            response = await http_client.get(f"{self.base_url}/models", timeout=LLM_CONNECT_TIMEOUT_SECONDS)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def stats(self) -> Dict:
+        return {
+            "outstanding": self.outstanding,
+            "latency_seconds": self.latency,
+            "failures": self.failures,
+            "ejected": self.ejected
+        }
+
+class LlmRouter:
+    """Sends each LLM call to the least-loaded healthy backend and fails over when one breaks."""
+
+    def __init__(self, base_urls: List[str], max_concurrency: int):
+        self.backends = [LlmBackend(url, max_concurrency) for url in base_urls]
+
+    def pick(self, exclude: Iterable[LlmBackend] = ()) -> Optional[LlmBackend]:
+        candidates = [b for b in self.backends if b not in exclude]
+        healthy = [b for b in candidates if not b.ejected]
+        # With every backend ejected, still try one rather than fail outright
+        pool = healthy or candidates
+        if not pool:
+            return None
+        return min(pool, key=lambda b: (b.score(), b.outstanding))
+
+    def has_healthy_besides(self, backend: LlmBackend) -> bool:
+        return any(b is not backend and not b.ejected for b in self.backends)
+
+    async def probe_loop(self):
+        """Re-probes ejected backends and puts them back once they answer again."""
+        while True:
+            await asyncio.sleep(LLM_PROBE_INTERVAL_SECONDS)
+            for backend in [b for b in self.backends if b.ejected]:
+                if await backend.probe():
+                    backend.ejected = False
+                    backend.failures = 0
+                    logger.info(f"LLM backend {backend.base_url} is reachable again")
+
+    def stats(self) -> Dict:
+        return {backend.base_url: backend.stats() for backend in self.backends}
+
+llm_router = LlmRouter(OLLAMA_BASE_URLS, LLM_MAX_CONCURRENCY)
+
+# Transcript chunking budget, in tokens of OLLAMA_MODEL
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", str(LLM_CONTEXT_TOKENS - 2048)))  # Leaves room for prompt and output
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "150"))
+logger.info(f"Using Ollama local LLM: {OLLAMA_MODEL}")
+
+# Transcription worker pool
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+TRANSCRIBE_QUEUE_SIZE = int(os.getenv("TRANSCRIBE_QUEUE_SIZE", "8"))
+TRANSCRIBE_RETRY_AFTER_SECONDS = int(os.getenv("TRANSCRIBE_RETRY_AFTER_SECONDS", "30"))
+# Whisper models are loaded on first use; 'base' is the speed/accuracy balance on CPU
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL", "base")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_ALLOWED_MODELS = [m.strip() for m in os.getenv("WHISPER_ALLOWED_MODELS", "tiny,base,small").split(",") if m.strip()]
+WHISPER_ALLOWED_COMPUTE_TYPES = {"int8", "int8_float32", "int16", "float32"}  # CPU-supported CTranslate2 types
+WHISPER_IDLE_TTL_SECONDS = int(os.getenv("WHISPER_IDLE_TTL_SECONDS", "900"))
+WHISPER_PREWARM = [m.strip() for m in os.getenv("WHISPER_PREWARM", "").split(",") if m.strip()]
+# Decoding profiles: "fast" (greedy) suits live meetings, "accurate" offline uploads; "balanced" is the default
+WHISPER_PROFILES = {
+    "fast": {"beam_size": 1, "temperature": 0.0, "condition_on_previous_text": False, "compute_type": "int8"},
+    "balanced": {"beam_size": 5, "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0], "condition_on_previous_text": True},
+    "accurate": {
+        "beam_size": 5,
+        "best_of": 5,
+        "patience": 2.0,
+        "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+        "condition_on_previous_text": True,
+        "compute_type": "float32"
+    },
+}
+WHISPER_PROFILE = os.getenv("WHISPER_PROFILE", "balanced")
+# CTranslate2 threads per transcription worker, sized so concurrent jobs together fill the host's cores
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0")) or max(1, (os.cpu_count() or 2) // TRANSCRIBE_WORKERS)
+WhisperSpec = Tuple[str, str, str]  # (size, compute type, decoding profile)
+
+# Batched throughput mode: final transcriptions that arrive together share batched inference calls
+WHISPER_BATCHED = os.getenv("WHISPER_BATCHED", "false").lower() == "true"
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))  # 30 s clips per forward pass
+WHISPER_BATCH_MAX_JOBS = int(os.getenv("WHISPER_BATCH_MAX_JOBS", "8"))
+WHISPER_BATCH_MAX_WAIT_SECONDS = float(os.getenv("WHISPER_BATCH_MAX_WAIT_SECONDS", "0.5"))
+WHISPER_CLIP_SECONDS = 30  # Whisper's input window
+
+# Voice activity detection: only speech spans are sent to Whisper, with their original timestamps
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "1000"))
+VAD_SPEECH_PAD_MS = int(os.getenv("VAD_SPEECH_PAD_MS", "400"))
+VAD_MERGE_GAP_SECONDS = float(os.getenv("VAD_MERGE_GAP_SECONDS", "2.0"))  # Fewer, longer clips decode faster
+
+# Initialize local Whisper
+try:
+    import av
+    from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+except ImportError:
+    logger.critical("faster-whisper not installed. Please run: pip install faster-whisper")
+    raise RuntimeError("faster-whisper is required for this configuration.")
+
+class WhisperRegistry:
+    """Loads Whisper models lazily per (size, compute type) and unloads them once idle."""
+
+    def __init__(self, idle_ttl: int):
+        self.idle_ttl = idle_ttl
+        self.models: Dict[Tuple[str, str], WhisperModel] = {}
+        self.last_used: Dict[Tuple[str, str], float] = {}
+        self.in_use: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    @staticmethod
+    def resolve(size: Optional[str] = None, compute_type: Optional[str] = None, profile: Optional[str] = None) -> WhisperSpec:
+        """Validates a requested model and decoding profile, defaulting to WHISPER_MODEL / WHISPER_PROFILE.
+
+        The compute type comes from the request, else the profile, else WHISPER_COMPUTE_TYPE.
+        """
+        size = size or WHISPER_MODEL_SIZE
+        profile = profile or WHISPER_PROFILE
+        if profile not in WHISPER_PROFILES:
+            raise ValueError(f"Decoding profile '{profile}' is unknown (choose from {list(WHISPER_PROFILES)})")
+        compute_type = compute_type or WHISPER_PROFILES[profile].get("compute_type") or WHISPER_COMPUTE_TYPE
+        if size not in WHISPER_ALLOWED_MODELS and size != WHISPER_MODEL_SIZE:
+            raise ValueError(f"Whisper model '{size}' is not allowed (choose from {WHISPER_ALLOWED_MODELS})")
+        if compute_type not in WHISPER_ALLOWED_COMPUTE_TYPES:
+            raise ValueError(f"Compute type '{compute_type}' is not supported on CPU")
+        return size, compute_type, profile
+
+    @contextlib.contextmanager
+    def use(self, size: Optional[str] = None, compute_type: Optional[str] = None, profile: Optional[str] = None):
+        """Yields a loaded model; it cannot be evicted while in use. Profiles share one instance per model."""
+        key = self.resolve(size, compute_type, profile)[:2]
+        model = self._load(key)
+        with self._lock:
+            self.in_use[key] = self.in_use.get(key, 0) + 1
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self.in_use[key] -= 1
+                self.last_used[key] = time.time()
+
+    def prewarm(self, sizes: List[str]):
+        for size in sizes:
+            try:
+                self._load(self.resolve(size)[:2])
+            except Exception as e:
+                logger.error(f"Failed to pre-warm Whisper model {size}: {e}")
+
+    def pinned(self) -> set:
+        """Models never evicted: the default one and WHISPER_PREWARM, which warm-up and /ready rely on."""
+        keys = set()
+        for size in [None] + WHISPER_PREWARM:
+            with contextlib.suppress(ValueError):
+                keys.add(self.resolve(size)[:2])
+        return keys
+
+    def evict_idle(self):
+        now = time.time()
+        pinned = self.pinned()
+        with self._lock:
+            idle = [
+                key for key in self.models
+                if key not in pinned and not self.in_use.get(key) and now - self.last_used.get(key, now) > self.idle_ttl
+            ]
+            for key in idle:
+                del self.models[key]
+                logger.info(f"Unloaded idle Whisper model {key[0]} ({key[1]})")
+        if idle:
+            gc.collect()
+
+    async def evict_loop(self):
+        while True:
+            await asyncio.sleep(max(30, min(300, self.idle_ttl // 2)))
+            self.evict_idle()
+
+    def stats(self) -> Dict:
+        return {f"{size}/{compute_type}": self.in_use.get((size, compute_type), 0) for size, compute_type in self.models}
+
+    def _load(self, key: Tuple[str, str]) -> WhisperModel:
+        with self._lock:
+            model = self.models.get(key)
+            if model is not None:
+                self.last_used[key] = time.time()
+                return model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                if key in self.models:
+                    return self.models[key]
+            started = time.time()
+            # Force CPU mode to avoid CUDA library requirements
+            # num_workers gives every pool thread its own CTranslate2 replica for parallel transcribe() calls
+            model = WhisperModel(
+                key[0],
+                device="cpu",
+                compute_type=key[1],
+                cpu_threads=WHISPER_CPU_THREADS,
+                num_workers=TRANSCRIBE_WORKERS
+            )
+            with self._lock:
+                self.models[key] = model
+                self.last_used[key] = time.time()
+            logger.info(f"Loaded local Whisper model ({key[0]}, {key[1]}) on CPU in {time.time() - started:.1f}s")
+            return model
+
+whisper_registry = WhisperRegistry(WHISPER_IDLE_TTL_SECONDS)
+
+def decode_options(model: WhisperSpec) -> Dict:
+    """transcribe() keyword arguments for the spec's decoding profile."""
+    return {key: value for key, value in WHISPER_PROFILES[model[2]].items() if key != "compute_type"}
+
+# Streaming transcription: settled audio windows are transcribed while the meeting is still recording
+STREAM_TRANSCRIPTION = os.getenv("STREAM_TRANSCRIPTION", "true").lower() == "true"
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", "60"))
+STREAM_TAIL_GUARD_SECONDS = float(os.getenv("STREAM_TAIL_GUARD_SECONDS", "3"))
+# Final passes and uploads are cut into shards near silence and transcribed on parallel workers
+SHARD_MIN_SECONDS = float(os.getenv("SHARD_MIN_SECONDS", "120"))  # Shorter audio stays a single call
+SHARD_SNAP_SECONDS = float(os.getenv("SHARD_SNAP_SECONDS", "15"))  # How far a cut may move to find silence
+SHARD_OVERLAP_SECONDS = float(os.getenv("SHARD_OVERLAP_SECONDS", "2"))  # Context decoded past each seam
+WHISPER_SAMPLE_RATE = 16000
+TranscriptSegment = Tuple[float, float, str]  # (start, end, text), seconds from the start of the recording
+
+# Session audio stays in memory up to AUDIO_SPILL_BYTES, then spills to a buffered file in AUDIO_TEMP_DIR
+AUDIO_TEMP_DIR = os.getenv("AUDIO_TEMP_DIR", os.path.join(tempfile.gettempdir(), "meeting-audio"))
+AUDIO_SPILL_BYTES = int(os.getenv("AUDIO_SPILL_BYTES", str(8 * 1024 * 1024)))
+MAX_AUDIO_BYTES = 100 * 1024 * 1024  # Per recording or upload; all of it is decoded in memory at the end
+os.makedirs(AUDIO_TEMP_DIR, exist_ok=True)
+RESUME_WINDOW_CHUNKS = int(os.getenv("RESUME_WINDOW_CHUNKS", "64"))  # Out-of-order chunks held per session
+
+# Session state: "memory" keeps sessions in this process; "sqlite" shares them across uvicorn workers
+# (audio then goes straight to AUDIO_TEMP_DIR, which all workers on the host can read)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.sqlite3")
+SESSION_RECORDING_TIMEOUT_SECONDS = 600
+SESSION_IDLE_TIMEOUT_SECONDS = 300
+SESSION_SYNC_INTERVAL_SECONDS = float(os.getenv("SESSION_SYNC_INTERVAL_SECONDS", "5"))  # For audio-only progress
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+class TranscriptionBusy(Exception):
+    """Raised when the transcription queue is full; the client should retry later."""
+
+class TranscriptionExecutor:
+    """Bounded worker pool that keeps Whisper decoding and inference off the event loop."""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whisper")
+        self.pending = 0  # Submitted jobs that have not finished (running + queued)
+        self.active = 0  # Jobs currently running on a worker
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.pending - self.active)
+
+    def stats(self) -> Dict:
+        return {"workers": self.workers, "active": self.active, "queued": self.queued, "max_queue": self.max_queue}
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs fn on a worker thread, or raises TranscriptionBusy at once if the queue is full."""
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                raise TranscriptionBusy(f"Transcription queue is full ({self.queued} waiting), retry later")
+            self.pending += 1
+        future = self.pool.submit(self._call, fn, *args, **kwargs)
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def _call(self, fn, *args, **kwargs):
+        with self._lock:
+            self.active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+
+transcription_executor = TranscriptionExecutor(TRANSCRIBE_WORKERS, TRANSCRIBE_QUEUE_SIZE)
+
+# Result cache (opt-in): audio hash -> transcript, transcript + participants -> ProcessingResult
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "false").lower() == "true"
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "86400"))
+CACHE_MAX_MEMORY_BYTES = int(os.getenv("CACHE_MAX_MEMORY_BYTES", str(64 * 1024 * 1024)))
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH")  # Optional on-disk tier, e.g. cache.sqlite3
+CACHE_MAX_DISK_BYTES = int(os.getenv("CACHE_MAX_DISK_BYTES", str(512 * 1024 * 1024)))
+PROMPT_VERSION = "2"  # Bump when prompts or analysis logic change so cached results are not reused
+
+class ResultCache:
+    """Two-tier LRU/TTL cache of serialized results: in memory, then optionally SQLite on disk.
+
+    The disk tier runs in a thread. Reads do not write; their access times are saved by the next set().
+    """
+
+    def __init__(self, ttl: int, max_memory_bytes: int, db_path: Optional[str] = None, max_disk_bytes: int = 0):
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self.memory_bytes = 0
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self._lock = threading.Lock()  # Memory tier and counters
+        self._db_lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}  # Disk keys read since the last write, with their access time
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+            self.db.commit()
+
+    @staticmethod
+    def key(namespace: str, *parts: str) -> str:
+        digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+        return f"{namespace}:{digest}"
+
+    async def get(self, key: str) -> Optional[str]:
+        namespace = key.split(":", 1)[0]
+        now = time.time()
+        with self._lock:
+            value = self._get_memory(key, now)
+        if value is None and self.db:
+            value = await asyncio.to_thread(self._get_disk, key, now)
+            if value is not None:
+                with self._lock:
+                    self._set_memory(key, value, now)
+        with self._lock:
+            counter = self.hits if value is not None else self.misses
+            counter[namespace] = counter.get(namespace, 0) + 1
+        return value
+
+    async def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._set_memory(key, value, now)
+        if self.db:
+            await asyncio.to_thread(self._set_disk, key, value, now)
+
+    def stats(self) -> Dict:
+        return {
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory_bytes
+        }
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < now:
+            self._pop_memory(key)
+            return None
+        self.memory.move_to_end(key)
+        return value
+
+    def _set_memory(self, key: str, value: str, now: float):
+        if key in self.memory:
+            self._pop_memory(key)
+        self.memory[key] = (now + self.ttl, value)
+        self.memory_bytes += len(value)
+        while self.memory_bytes > self.max_memory_bytes and self.memory:
+            self._pop_memory(next(iter(self.memory)))
+
+    def _pop_memory(self, key: str):
+        _, value = self.memory.pop(key)
+        self.memory_bytes -= len(value)
+
+    def _get_disk(self, key: str, now: float) -> Optional[str]:
+        with self._db_lock:
+            row = self.db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                return None  # Expired rows go in the next set()'s sweep
+            self._accessed[key] = now
+            return row[0]
+
+    def _set_disk(self, key: str, value: str, now: float):
+        with self._db_lock:
+            self._write_disk(key, value, now)
+
+    def _write_disk(self, key: str, value: str, now: float):
+        if self._accessed:
+            self.db.executemany(
+                "UPDATE cache SET last_access = ? WHERE key = ?", [(t, k) for k, t in self._accessed.items()]
+            )
+            self._accessed.clear()
+        self.db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value), now + self.ttl, now)
+        )
+        self.db.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total > self.max_disk_bytes:
+            # Drop least recently used rows until the tier is back under its cap
+            excess = total - self.max_disk_bytes
+            freed = 0
+            for old_key, size in self.db.execute("SELECT key, size FROM cache ORDER BY last_access").fetchall():
+                if freed >= excess:
+                    break
+                self.db.execute("DELETE FROM cache WHERE key = ?", (old_key,))
+                freed += size
+        self.db.commit()
+
+result_cache = (
+    ResultCache(CACHE_TTL_SECONDS, CACHE_MAX_MEMORY_BYTES, CACHE_DB_PATH, CACHE_MAX_DISK_BYTES)
+    if CACHE_ENABLED else None
+)
+
+def transcript_cache_key(audio_hash: str, model: WhisperSpec) -> str:
+    return ResultCache.key("transcript", audio_hash, *model)
+
+def segments_cache_key(audio_hash: str, model: WhisperSpec, excluded: List[Tuple[float, float]]) -> str:
+    """Session segments also depend on the spans skipped as muted."""
+    spans = json.dumps([[round(start, 3), round(end, 3)] for start, end in excluded])
+    return ResultCache.key("segments", audio_hash, *model, spans)
+
+def analysis_cache_key(transcript: str, participants_json: str) -> str:
+    return ResultCache.key("analysis", transcript, participants_json, OLLAMA_MODEL, OLLAMA_SMALL_MODEL, PROMPT_VERSION)
+
+sg = SendGridAPIClient(os.getenv("SENDGRID_API_KEY")) if os.getenv("SENDGRID_API_KEY") else None
+
+# Outbound email: queued and delivered in batches off the request path
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "sendgrid")  # sendgrid | file | smtp
+EMAIL_OUTBOX_DIR = os.getenv("EMAIL_OUTBOX_DIR", "outbox")  # file transport
+EMAIL_SMTP_HOST = os.getenv("EMAIL_SMTP_HOST", "localhost")  # smtp transport, e.g. a local debugging server
+EMAIL_SMTP_PORT = int(os.getenv("EMAIL_SMTP_PORT", "1025"))
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "2"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "100"))  # Personalizations per send (SendGrid allows 1000)
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "4"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "2"))
+EMAIL_STATUS_DB_PATH = os.getenv("EMAIL_STATUS_DB_PATH", "email_status.sqlite3")  # Shared by all workers
+EMAIL_STATUS_RETENTION_SECONDS = int(os.getenv("EMAIL_STATUS_RETENTION_SECONDS", str(24 * 3600)))
+
+# Models
+class Task(BaseModel):
+    task: str
+    deadline: Optional[str] = None
+
+class Participant(BaseModel):
+    name: str
+    email: EmailStr
+    tasks: List[Task] = []
+
+class ProcessingResult(BaseModel):
+    meeting_summary: str
+    transcript: str
+    participants: List[Participant]
+    email_dispatch_id: Optional[str] = None  # Poll /email-status/{id} for delivery status
+
+# What the LLM is asked to produce; passed to Ollama as structured-output schemas.
+# The transcript and dispatch id are filled in by the server, never generated.
+class ParticipantOutput(BaseModel):
+    name: str
+    email: str
+    tasks: List[Task] = []
+
+class AnalysisOutput(BaseModel):
+    meeting_summary: str
+    participants: List[ParticipantOutput]
+
+class ChunkTaskOutput(BaseModel):
+    owner: str
+    task: str
+    deadline: Optional[str] = None
+
+class ChunkOutput(BaseModel):
+    summary_points: List[str] = []
+    tasks: List[ChunkTaskOutput] = []
+
+class ReduceOutput(BaseModel):
+    meeting_summary: str
+
+class TranscriptChunk(BaseModel):
+    text: str
+    token_count: int
+
+class ParticipantInput(BaseModel):
+    name: str
+    email: EmailStr
+
+class TranscriptProcessRequest(BaseModel):
+    transcript: str
+    participants: List[ParticipantInput]
+    meeting_title: Optional[str] = None
+
+# System Prompt
+SYSTEM_PROMPT = """You are a privacy-first AI meeting assistant.
+
+Your role:
+- Analyze a meeting transcript up to 45 minutes long
+- Generate a concise Notion-style meeting summary
+- Extract action items
+- Assign tasks to participants
+- Prepare structured data for email notifications
+- Do NOT store or reference past meetings
+
+TRANSCRIPT HANDLING RULES:
+If input is from live audio (Whisper output):
+- Expect filler words ("um", "uh", "like") and verbal timestamps
+- Clean filler words during extraction but preserve semantic meaning
+- Speaker diarization is unavailable; assume single stream or use paragraph breaks as speaker changes
+- [Microphone Muted] and [Microphone Unmuted] markers are already placed in the transcript
+- Between those markers, only system audio (other participants) was captured
+
+If input is raw pasted text:
+- Assume text is pre-edited (cleaner grammar)
+- Look for markdown headers or bullet points that indicate agenda structure
+- If text contains "Speaker Name:" prefixes, parse and preserve attribution
+
+Rules:
+- Do NOT invent tasks, decisions, or deadlines
+- Be conservative in task extraction
+- If task ownership is unclear, mark as 'Unassigned'
+- IMPORTANT: You will receive a participants list. You MUST return the SAME participants in your output
+- Each participant MUST have both "name" and "email" fields (never null or empty)
+- If a participant has no tasks, return an empty tasks array []
+- Output JSON only
+
+Output schema:
+{
+  "meeting_summary": "string",
+  "participants": [
+    {
+      "name": "string (required, never null)",
+      "email": "string (required, never null)",
+      "tasks": [
+        {
+          "task": "string",
+          "deadline": "string or null"
+        }
+      ]
+    }
+  ]
+}
+
+CRITICAL: Return ALL participants from the input list, even if they have no tasks.
+"""
+
+# Map-reduce prompts for transcripts longer than one chunk
+CHUNK_PROMPT = """You are a privacy-first AI meeting assistant reading ONE PART of a longer meeting transcript.
+
+Your role:
+- Note the key points discussed in this part
+- Extract action items from this part only
+
+Rules:
+- Do NOT invent tasks, decisions, or deadlines
+- Be conservative in task extraction
+- Clean filler words but preserve semantic meaning
+- Set "owner" to the email of the participant responsible, taken from the participants list
+- If task ownership is unclear, set "owner" to "Unassigned"
+- Output JSON only
+
+Output schema:
+{
+  "summary_points": ["string"],
+  "tasks": [
+    {
+      "owner": "string (participant email or 'Unassigned')",
+      "task": "string",
+      "deadline": "string or null"
+    }
+  ]
+}
+"""
+
+REPAIR_PROMPT = """You fix malformed JSON.
+
+You will receive a JSON document that failed to parse, and the parser error.
+Return the same content as valid JSON. Do NOT add, drop or change any information.
+Output JSON only.
+"""
+
+REDUCE_PROMPT = """You are a privacy-first AI meeting assistant.
+
+You will receive notes taken from consecutive parts of ONE meeting, in order.
+Merge them into a single concise Notion-style meeting summary.
+
+Rules:
+- Remove repeated points (parts overlap slightly)
+- Do NOT add anything that is not in the notes
+- Output JSON only
+
+Output schema:
+{
+  "meeting_summary": "string"
+}
+"""
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "healthy" if warmup.ready else "warming_up",
+        "warm": warmup.ready,
+        "warmup": warmup.status,
+        "llm": "ollama",
+        "whisper": "faster-whisper",
+        "transcription": transcription_executor.stats(),
+        "whisper_models": whisper_registry.stats(),
+        "cache": result_cache.stats() if result_cache else None,
+        "llm_backends": llm_router.stats()
+    }
+
+Gauge("meeting_transcription_queued", "Transcription jobs waiting for a worker", fn=lambda: transcription_executor.queued)
+Gauge("meeting_transcription_active", "Transcription jobs running", fn=lambda: transcription_executor.active)
+Gauge("meeting_email_queue_depth", "Email batches waiting to be sent", fn=lambda: email_dispatcher.queue.qsize())
+Gauge("meeting_active_sessions", "Recording sessions held by this worker", fn=lambda: len(session_manager.sessions))
+Gauge(
+    "meeting_session_bytes_buffered", "Audio bytes held by this worker's sessions",
+    fn=lambda: sum(sess.audio.size for sess in list(session_manager.sessions.values()))
+)
+Gauge("meeting_background_jobs", "Asynchronous jobs running in this worker", fn=lambda: len(background_jobs))
+Gauge("meeting_whisper_models_loaded", "Whisper models in memory", fn=lambda: len(whisper_registry.models))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        "\n".join(line for metric in METRICS for line in metric.render()) + "\n",
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: pre-warmed Whisper models are loaded and at least one LLM backend answers."""
+    missing = []
+    for size in WHISPER_PREWARM:
+        with contextlib.suppress(ValueError):
+            if WhisperRegistry.resolve(size)[:2] not in whisper_registry.models:
+                missing.append(size)
+    llm_ok = any(await asyncio.gather(*(backend.probe() for backend in llm_router.backends)))
+    checks = {"warm": warmup.ready, "whisper_models": not missing, "llm": llm_ok}
+    is_ready = all(checks.values())
+    return JSONResponse(
+        {"ready": is_ready, "checks": checks, "missing_whisper_models": missing},
+        status_code=200 if is_ready else 503
+    )
+
+@app.get("/email-status/{dispatch_id}")
+async def email_status(dispatch_id: str):
+    statuses = await email_dispatcher.get_status(dispatch_id)
+    if statuses is None:
+        raise HTTPException(status_code=404, detail="Unknown dispatch id")
+    return {"dispatch_id": dispatch_id, "participants": statuses}
+
+@app.post("/test-email")
+async def test_email(email: EmailStr):
+    if not sg:
+        raise HTTPException(status_code=500, detail="SendGrid not configured")
+    
+    message = Mail(
+        from_email=os.getenv("FROM_EMAIL"),
+        to_emails=email,
+        subject='Test Email from AI Meeting Assistant',
+        plain_text_content='If you receive this, your email configuration is working correctly.'
+    )
+    try:
+        await asyncio.to_thread(sg.send, message)
+        return {"status": "sent"}
+    except Exception as e:
+        logger.error(f"Email failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def read_upload(file: UploadFile) -> Tuple["AudioBuffer", str]:
+    """Buffers an uploaded file for the transcription workers and returns it with its content hash.
+
+    Raises HTTPException 413 past MAX_AUDIO_BYTES, the same cap as recording sessions.
+    """
+    audio = AudioBuffer(suffix=os.path.splitext(file.filename or "")[1] or ".webm")
+    audio_hash = hashlib.sha256()
+    chunk_size = 1024 * 1024 # 1MB chunks
+    with UPLOAD_INGEST_SECONDS.time():
+        while content := await file.read(chunk_size):
+            if audio.size + len(content) > MAX_AUDIO_BYTES:
+                audio.close()
+                raise HTTPException(status_code=413, detail="Size limit exceeded (100MB)")
+            audio.write(content)
+            audio_hash.update(content)
+    INGEST_BYTES.inc(audio.size, source="upload")
+    return audio, audio_hash.hexdigest()
+
+async def transcribe_buffer(audio: "AudioBuffer", audio_hash: str, model: WhisperSpec) -> str:
+    """Transcribes buffered audio through the result cache. Raises TranscriptionBusy if the pool is full."""
+    cache_key = transcript_cache_key(audio_hash, model)
+    cached = await result_cache.get(cache_key) if result_cache else None
+    if cached is not None:
+        return cached
+
+    decoded = await transcription_executor.run(decode_buffer, audio)
+    if WHISPER_BATCHED:
+        segments = await batched_transcriber.transcribe(decoded, model)
+    else:
+        segments = await transcribe_sharded(decoded, 0.0, model)
+    transcript_text = " ".join(text for _, _, text in segments)
+    if result_cache:
+        await result_cache.set(cache_key, transcript_text)
+    return transcript_text
+
+async def transcribe_audio(
+    file: UploadFile,
+    model_size: Optional[str] = None,
+    compute_type: Optional[str] = None,
+    profile: Optional[str] = None
+):
+    """Transcribes audio using local Faster Whisper."""
+    try:
+        model = WhisperRegistry.resolve(model_size, compute_type, profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Buffered for the worker, deleted as soon as transcription ends
+    audio, audio_hash = await read_upload(file)
+    try:
+        return await transcribe_buffer(audio, audio_hash, model)
+    except TranscriptionBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(TRANSCRIBE_RETRY_AFTER_SECONDS)}
+        )
+    except Exception as e:
+        logger.error(f"Transcription failed: {e}")
+        raise HTTPException(status_code=500, detail="Transcription failed")
+    finally:
+        audio.close()
+
+@app.post("/transcribe")
+async def transcribe_upload(
+    file: UploadFile = File(...),
+    whisper_model: Optional[str] = Form(None),
+    compute_type: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None)  # fast | balanced | accurate
+):
+    """Transcribes an uploaded recording; long recordings are split across the transcription workers."""
+    return {"transcript": await transcribe_audio(file, whisper_model, compute_type, profile)}
+
+EMAIL_SUBJECT = 'Your action items from today’s meeting'
+
+def render_email_body(name: str, summary: str, tasks_html: str) -> str:
+    return f"""
+    Hi {name},<br><br>
+    Here’s a summary of the meeting:<br>
+    {summary}<br><br>
+    Your action items:<br>
+    {tasks_html}<br><br>
+    Thanks!
+    """
+
+def render_tasks_html(participant: Participant) -> str:
+    return "<ul>" + "".join([f"<li>{t.task} (Deadline: {t.deadline or 'N/A'})</li>" for t in participant.tasks]) + "</ul>"
+
+class EmailTransport:
+    """Delivers one batch of participant emails that share a meeting summary."""
+
+    def send(self, summary: str, participants: List[Participant]):
+        raise NotImplementedError
+
+class SendGridTransport(EmailTransport):
+    """One API call per batch: each participant is a personalization with their own name and tasks."""
+
+    def send(self, summary: str, participants: List[Participant]):
+        message = Mail(
+            from_email=os.getenv("FROM_EMAIL"),
+            to_emails=[
+                To(p.email, p.name, substitutions={"-name-": p.name, "-tasks-": render_tasks_html(p)})
+                for p in participants
+            ],
+            subject=EMAIL_SUBJECT,
+            html_content=render_email_body("-name-", summary, "-tasks-"),
+            is_multiple=True
+        )
+        sg.send(message)
+
+class FileTransport(EmailTransport):
+    """Appends rendered emails to a JSON-lines outbox file instead of sending them (local runs and tests)."""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, "outbox.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def send(self, summary: str, participants: List[Participant]):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for p in participants:
+                f.write(json.dumps({
+                    "to": p.email,
+                    "subject": EMAIL_SUBJECT,
+                    "html": render_email_body(p.name, summary, render_tasks_html(p)),
+                    "sent_at": time.time()
+                }) + "\n")
+
+class SmtpTransport(EmailTransport):
+    """Sends each email over plain SMTP, e.g. to a local debugging server."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+    def send(self, summary: str, participants: List[Participant]):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            for p in participants:
+                message = EmailMessage()
+                message["From"] = os.getenv("FROM_EMAIL") or "meetings@localhost"
+                message["To"] = p.email
+                message["Subject"] = EMAIL_SUBJECT
+                message.set_content(render_email_body(p.name, summary, render_tasks_html(p)), subtype="html")
+                smtp.send_message(message)
+
+def create_email_transport() -> Optional[EmailTransport]:
+    if EMAIL_TRANSPORT == "file":
+        return FileTransport(EMAIL_OUTBOX_DIR)
+    if EMAIL_TRANSPORT == "smtp":
+        return SmtpTransport(EMAIL_SMTP_HOST, EMAIL_SMTP_PORT)
+    return SendGridTransport() if sg else None
+
+class EmailStatusStore:
+    """Per-recipient delivery status in SQLite, so any worker can answer /email-status.
+
+    Calls block on the database lock; from async code run them via asyncio.to_thread.
+    """
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS email_status ("
+            "dispatch_id TEXT NOT NULL, email TEXT NOT NULL, status TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (dispatch_id, email))"
+        )
+        self.db.commit()
+        self._lock = threading.Lock()
+
+    def mark(self, dispatch_id: str, emails: List[str], status: str):
+        now = time.time()
+        with self._lock:
+            self.db.executemany(
+                "INSERT INTO email_status (dispatch_id, email, status, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (dispatch_id, email) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                [(dispatch_id, email, status, now) for email in emails]
+            )
+            self.db.commit()
+
+    def get(self, dispatch_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT email, status FROM email_status WHERE dispatch_id = ? ORDER BY rowid", (dispatch_id,)
+            ).fetchall()
+        return dict(rows) if rows else None
+
+    def purge(self):
+        with self._lock:
+            self.db.execute(
+                "DELETE FROM email_status WHERE updated_at < ?", (time.time() - EMAIL_STATUS_RETENTION_SECONDS,)
+            )
+            self.db.commit()
+
+class EmailDispatcher:
+    """Background queue that delivers participant emails in batches with retry and backoff."""
+
+    def __init__(
+        self,
+        transport: Optional[EmailTransport],
+        store: EmailStatusStore,
+        workers: int,
+        batch_size: int,
+        max_retries: int
+    ):
+        self.transport = transport
+        self.store = store  # dispatch id -> {email: queued | retrying | sent | failed}
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def start(self):
+        for _ in range(self.workers):
+            asyncio.create_task(self._worker())
+        asyncio.create_task(self._purge_loop())
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.to_thread(self.store.purge)
+            await asyncio.sleep(3600)
+
+    async def submit(self, summary: str, participants: List[Participant]) -> Optional[str]:
+        """Queues emails for participants with tasks and returns a dispatch id right away."""
+        recipients = [p for p in participants if p.tasks]
+        if not recipients:
+            return None
+        if not self.transport:
+            logger.warning("Email transport not configured, skipping participant emails")
+            return None
+
+        dispatch_id = str(uuid.uuid4())
+        await asyncio.to_thread(self.store.mark, dispatch_id, [p.email for p in recipients], "queued")
+        for i in range(0, len(recipients), self.batch_size):
+            self.queue.put_nowait((dispatch_id, summary, recipients[i:i + self.batch_size]))
+        return dispatch_id
+
+    async def get_status(self, dispatch_id: str) -> Optional[Dict[str, str]]:
+        return await asyncio.to_thread(self.store.get, dispatch_id)
+
+    async def _mark(self, dispatch_id: str, batch: List[Participant], state: str):
+        await asyncio.to_thread(self.store.mark, dispatch_id, [p.email for p in batch], state)
+
+    async def _worker(self):
+        while True:
+            dispatch_id, summary, batch = await self.queue.get()
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        with EMAIL_SEND_SECONDS.time():
+                            await asyncio.to_thread(self.transport.send, summary, batch)
+                        await self._mark(dispatch_id, batch, "sent")
+                        EMAILS.inc(len(batch), outcome="sent")
+                        break
+                    except Exception as e:
+                        if attempt == self.max_retries:
+                            logger.error(f"Failed to send {len(batch)} email(s) for {dispatch_id}: {e}")
+                            await self._mark(dispatch_id, batch, "failed")
+                            EMAILS.inc(len(batch), outcome="failed")
+                        else:
+                            await self._mark(dispatch_id, batch, "retrying")
+                            EMAILS.inc(len(batch), outcome="retried")
+                            await asyncio.sleep(EMAIL_RETRY_BASE_SECONDS * 2 ** attempt)
+            finally:
+                self.queue.task_done()
+
+email_dispatcher = EmailDispatcher(
+    create_email_transport(), EmailStatusStore(EMAIL_STATUS_DB_PATH), EMAIL_WORKERS, EMAIL_BATCH_SIZE, EMAIL_MAX_RETRIES
+)
+
+async def dispatch_participant_emails(result: ProcessingResult, participant_emails: set):
+    """Queues emails for the requested participants and records the dispatch id on the result."""
+    recipients = [p for p in result.participants if p.email in participant_emails and p.tasks]
+    result.email_dispatch_id = await email_dispatcher.submit(result.meeting_summary, recipients)
+
+def _remove_file(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+class AudioBuffer:
+    """Append-only audio held in memory until `spill_bytes`, then in a buffered temp file.
+
+    Writers keep one handle open for the buffer's lifetime. Readers get an independent
+    handle, so workers can decode while ingest keeps appending.
+    """
+
+    def __init__(self, suffix: str = ".webm", spill_bytes: int = AUDIO_SPILL_BYTES):
+        self.suffix = suffix
+        self.spill_bytes = spill_bytes
+        self.size = 0
+        self.path: Optional[str] = None
+        self._memory: Optional[io.BytesIO] = io.BytesIO()
+        self._file = None
+        self._finalizer = None
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes):
+        with self._lock:
+            if self._file is None and self.size + len(data) > self.spill_bytes:
+                self._spill()
+            (self._file or self._memory).write(data)
+            self.size += len(data)
+
+    def reader(self) -> BinaryIO:
+        """Returns a read handle over everything written so far."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                return open(self.path, "rb")
+            # getvalue() hands out the BytesIO's own bytes object and BytesIO(bytes) shares it,
+            # so the in-memory snapshot is not copied unless ingest writes again
+            return io.BytesIO(self._memory.getvalue())
+
+    def flush(self):
+        """Makes everything written so far visible to other processes reading the spill file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def detach(self):
+        """Releases the buffer but keeps its spill file, which another worker has taken over.
+
+        Unflushed writes are dropped: the new owner may already have written past our last flush.
+        """
+        with self._lock:
+            if self._file is not None:
+                with contextlib.suppress(Exception):
+                    # Closing the raw file first turns the buffered writer's close into a no-op
+                    self._file.raw.close()
+                self._finalizer.detach()
+                self._file = None
+            self._memory = io.BytesIO()
+            self.size = 0
+
+    @classmethod
+    def adopt(cls, path: str, size: Optional[int] = None) -> "AudioBuffer":
+        """Reopens a spill file written by another worker and continues appending to it.
+
+        `size` cuts off bytes written after the state that is being resumed; the client re-sends them.
+        """
+        buffer = cls(suffix=os.path.splitext(path)[1], spill_bytes=0)
+        buffer.path = path
+        buffer._memory = None
+        buffer._file = open(path, "ab", buffering=1024 * 1024)
+        if size is not None:
+            buffer._file.truncate(size)
+            buffer._file.seek(0, os.SEEK_END)
+        buffer.size = buffer._file.tell()
+        buffer._finalizer = weakref.finalize(buffer, _remove_file, path)
+        return buffer
+
+    def close(self):
+        """Releases the buffer and deletes its spill file, if any."""
+        with self._lock:
+            if self._file is not None:
+                with contextlib.suppress(Exception):
+                    self._file.close()
+                self._finalizer()
+                self._file = None
+            self._memory = io.BytesIO()
+            self.size = 0
+
+    def _spill(self):
+        fd, self.path = tempfile.mkstemp(suffix=self.suffix, prefix="session_", dir=AUDIO_TEMP_DIR)
+        # Deletes the spill file even if close() is never called (GC or interpreter exit)
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+        self._file = os.fdopen(fd, "wb", buffering=1024 * 1024)
+        self._file.write(self._memory.getbuffer())
+        self._memory = None
+
+def decode_buffer(source: AudioBuffer) -> np.ndarray:
+    """Decodes a whole audio buffer to 16 kHz mono float32. Runs on a transcription worker."""
+    with DECODE_SECONDS.time(), source.reader() as f:
+        return decode_audio(f, sampling_rate=WHISPER_SAMPLE_RATE)
+
+def subtract_spans(spans: List[Tuple[float, float]], excluded: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Removes the `excluded` intervals from sorted `spans`."""
+    excluded = sorted(excluded)
+    result = []
+    for start, end in spans:
+        for ex_start, ex_end in excluded:
+            if ex_end <= start or ex_start >= end:
+                continue
+            if ex_start > start:
+                result.append((start, ex_start))
+            start = max(start, ex_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+def speech_spans(audio: np.ndarray, excluded: List[Tuple[float, float]] = ()) -> List[Tuple[float, float]]:
+    """Returns the speech regions of 16 kHz audio in seconds, minus `excluded` intervals.
+
+    Regions closer than VAD_MERGE_GAP_SECONDS are merged so Whisper sees fewer, longer clips.
+    """
+    duration = len(audio) / WHISPER_SAMPLE_RATE
+    if duration <= 0:
+        return []
+    if VAD_ENABLED:
+        options = VadOptions(min_silence_duration_ms=VAD_MIN_SILENCE_MS, speech_pad_ms=VAD_SPEECH_PAD_MS)
+        spans = [
+            (stamp["start"] / WHISPER_SAMPLE_RATE, stamp["end"] / WHISPER_SAMPLE_RATE)
+            for stamp in get_speech_timestamps(audio, options)
+        ]
+    else:
+        spans = [(0.0, duration)]
+
+    merged: List[Tuple[float, float]] = []
+    for start, end in subtract_spans(spans, list(excluded)):
+        if merged and start - merged[-1][1] < VAD_MERGE_GAP_SECONDS:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def transcribe_file_window(
+    source: AudioBuffer,
+    offset: float,
+    final: bool,
+    model: WhisperSpec,
+    min_seconds: float = 0.0,
+    excluded: List[Tuple[float, float]] = ()
+) -> Tuple[List[TranscriptSegment], float]:
+    """Decodes the audio received so far and transcribes it from `offset`. Runs on a transcription worker.
+
+    Returns no segments and the unchanged offset when less than `min_seconds` of new audio is available.
+    """
+    audio = decode_buffer(source)
+    if len(audio) / WHISPER_SAMPLE_RATE - offset < min_seconds:
+        return [], offset
+    return transcribe_window(audio[int(offset * WHISPER_SAMPLE_RATE):], offset, final, model, excluded)
+
+def transcribe_pcm_window(
+    pcm: "PcmBuffer",
+    offset: float,
+    final: bool,
+    model: WhisperSpec,
+    min_seconds: float = 0.0,
+    excluded: List[Tuple[float, float]] = ()
+) -> Tuple[List[TranscriptSegment], float]:
+    """Transcribes already-decoded session PCM from `offset`. Runs on a transcription worker."""
+    if pcm.seconds - offset < min_seconds:
+        return [], offset
+    return transcribe_window(pcm.to_float32(int(offset * WHISPER_SAMPLE_RATE)), offset, final, model, excluded)
+
+def transcribe_window(
+    window: np.ndarray,
+    offset: float,
+    final: bool,
+    model: WhisperSpec,
+    excluded: List[Tuple[float, float]] = ()
+) -> Tuple[List[TranscriptSegment], float]:
+    """Transcribes the speech in a window of 16 kHz audio that starts `offset` seconds into the recording.
+
+    `excluded` holds recording-time intervals to skip (e.g. muted spans). Returns the segments,
+    timed from the start of the recording, and the new offset. Unless `final`, segments ending inside the tail guard are left
+    for the next window.
+    """
+    window_seconds = len(window) / WHISPER_SAMPLE_RATE
+    if window_seconds <= 0:
+        return [], offset
+    settled = window_seconds - STREAM_TAIL_GUARD_SECONDS
+
+    spans = speech_spans(window, [(start - offset, end - offset) for start, end in excluded])
+    logger.info(
+        f"Speech in window at {offset:.1f}s: {sum(end - start for start, end in spans):.1f}s of {window_seconds:.1f}s"
+    )
+
+    results = []
+    committed = 0.0
+    held_back = False
+    if spans:
+        with whisper_registry.use(*model) as whisper_model:
+            started = time.perf_counter()
+            segments, info = whisper_model.transcribe(
+                window,
+                clip_timestamps=[t for span in spans for t in span],
+                **decode_options(model)
+            )
+            for segment in segments:
+                if not final and segment.end > settled:
+                    held_back = True
+                    break
+                results.append((offset + segment.start, offset + segment.end, segment.text))
+                committed = segment.end
+            record_transcription("window", time.perf_counter() - started, window_seconds)
+
+    if final:
+        committed = window_seconds
+    elif not held_back:
+        # Everything before the tail guard was either transcribed or non-speech
+        committed = max(committed, settled)
+    return results, offset + committed
+
+def quietest_point(audio: np.ndarray, target: float, radius: float) -> float:
+    """Returns the time within `radius` seconds of `target` with the least energy, to 100 ms."""
+    frame = WHISPER_SAMPLE_RATE // 10
+    first = max(0, int((target - radius) * WHISPER_SAMPLE_RATE) // frame)
+    last = min(len(audio) // frame, int((target + radius) * WHISPER_SAMPLE_RATE) // frame + 1)
+    if last <= first:
+        return target
+    energy = np.square(audio[first * frame:last * frame].reshape(-1, frame)).mean(axis=1)
+    return (first + int(np.argmin(energy)) + 0.5) * frame / WHISPER_SAMPLE_RATE
+
+def plan_shards(audio: np.ndarray, shards: int) -> List[Tuple[float, float]]:
+    """Splits 16 kHz audio into about `shards` equal (start, end) ranges, each cut moved into nearby silence."""
+    duration = len(audio) / WHISPER_SAMPLE_RATE
+    cuts = [quietest_point(audio, duration * i / shards, SHARD_SNAP_SECONDS) for i in range(1, shards)]
+    bounds = [0.0] + sorted(cuts) + [duration]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def transcribe_shard(
+    audio: np.ndarray,
+    offset: float,
+    start: float,
+    end: float,
+    model: WhisperSpec,
+    excluded: List[Tuple[float, float]] = ()
+) -> List[TranscriptSegment]:
+    """Transcribes audio[start:end] with SHARD_OVERLAP_SECONDS of context each side. Runs on a transcription worker.
+
+    Only segments whose midpoint lies inside the shard are kept, so a segment decoded by both
+    shards at a seam survives exactly once.
+    """
+    first = max(0.0, start - SHARD_OVERLAP_SECONDS)
+    window = audio[int(first * WHISPER_SAMPLE_RATE):int((end + SHARD_OVERLAP_SECONDS) * WHISPER_SAMPLE_RATE)]
+    segments, _ = transcribe_window(window, offset + first, True, model, excluded)
+    return [
+        segment for segment in segments
+        if offset + start <= (segment[0] + segment[1]) / 2 < offset + end
+    ]
+
+async def transcribe_sharded(
+    audio: np.ndarray,
+    offset: float,
+    model: WhisperSpec,
+    excluded: List[Tuple[float, float]] = ()
+) -> List[TranscriptSegment]:
+    """Transcribes audio starting `offset` seconds into the recording as parallel shards.
+
+    The model is loaded with num_workers=TRANSCRIBE_WORKERS, so each worker thread decodes its
+    shard concurrently. Shards are capped by free pool slots; segments come back in time order.
+    """
+    duration = len(audio) / WHISPER_SAMPLE_RATE
+    stats = transcription_executor.stats()
+    free = stats["workers"] + stats["max_queue"] - transcription_executor.pending
+    shards = max(1, min(TRANSCRIBE_WORKERS, free, int(duration // SHARD_MIN_SECONDS)))
+    bounds = plan_shards(audio, shards)
+    if len(bounds) > 1:
+        logger.info(f"Transcribing {duration:.0f}s at {offset:.1f}s as {len(bounds)} shards")
+    results = await asyncio.gather(
+        *(
+            transcription_executor.run(transcribe_shard, audio, offset, start, end, model, excluded)
+            for start, end in bounds
+        ),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return sorted((segment for shard in results for segment in shard), key=lambda segment: segment[0])
+
+def record_transcription(mode: str, seconds: float, audio_seconds: float):
+    TRANSCRIBE_SECONDS.observe(seconds, mode=mode)
+    TRANSCRIBE_AUDIO_SECONDS.inc(audio_seconds, mode=mode)
+    if audio_seconds > 0:
+        TRANSCRIBE_RTF.observe(seconds / audio_seconds, mode=mode)
+
+def annotate_transcript(segments: Iterable[TranscriptSegment], muted: List[Tuple[float, float]]) -> Iterator[str]:
+    """Yields transcript text with mute markers placed by time, consuming segments as they come.
+
+    A marker goes before the first segment whose midpoint is at or after it; markers after the
+    last segment are kept, so a recording that ends muted says so.
+    """
+    markers = sorted(
+        [(start, "[Microphone Muted]") for start, _ in muted]
+        + [(end, "[Microphone Unmuted]") for _, end in muted if end != float("inf")]
+    )
+    i = 0
+    for start, end, text in segments:
+        while i < len(markers) and markers[i][0] <= (start + end) / 2:
+            yield markers[i][1]
+            i += 1
+        yield text.strip()
+    yield from (label for _, label in markers[i:])
+
+def transcribe_batch(
+    audios: List[np.ndarray],
+    model: WhisperSpec,
+    excluded: Optional[List[List[Tuple[float, float]]]] = None
+) -> List[List[Tuple[float, float, str]]]:
+    """Transcribes several jobs' audio in shared batched inference calls. Runs on a transcription worker.
+
+    Jobs are laid end to end and their speech spans cut into clips that never cross a job
+    boundary, so each output segment belongs to exactly one job. Returns (start, end, text)
+    per job, with times relative to that job's audio.
+    """
+    offsets = []
+    clips = []
+    position = 0.0
+    for i, audio in enumerate(audios):
+        offsets.append(position)
+        for span_start, span_end in speech_spans(audio, excluded[i] if excluded else ()):
+            start = span_start
+            while start < span_end:
+                end = min(span_end, start + WHISPER_CLIP_SECONDS)
+                clips.append({"start": position + start, "end": position + end})
+                start = end
+        position += len(audio) / WHISPER_SAMPLE_RATE
+
+    results: List[List[Tuple[float, float, str]]] = [[] for _ in audios]
+    if not clips:
+        return results
+
+    joined = np.concatenate(audios)
+    with whisper_registry.use(*model) as whisper_model:
+        started = time.perf_counter()
+        pipeline = BatchedInferencePipeline(model=whisper_model)
+        segments, info = pipeline.transcribe(
+            joined,
+            clip_timestamps=clips,
+            batch_size=WHISPER_BATCH_SIZE,
+            **decode_options(model)
+        )
+        for segment in segments:
+            job = bisect.bisect_right(offsets, (segment.start + segment.end) / 2) - 1
+            results[job].append((segment.start - offsets[job], segment.end - offsets[job], segment.text))
+        record_transcription("batch", time.perf_counter() - started, position)
+    return results
+
+class BatchedTranscriber:
+    """Collects final transcription jobs for up to WHISPER_BATCH_MAX_WAIT_SECONDS and runs them as one batch."""
+
+    def __init__(self, max_jobs: int, max_wait: float):
+        self.max_jobs = max_jobs
+        self.max_wait = max_wait
+        self.pending: Dict[WhisperSpec, List[Tuple[np.ndarray, List, asyncio.Future]]] = {}
+        self._timers: Dict[WhisperSpec, asyncio.Task] = {}
+        self._running = set()  # Strong references so in-flight batches are not garbage-collected
+
+    async def transcribe(
+        self,
+        audio: np.ndarray,
+        model: WhisperSpec,
+        excluded: List[Tuple[float, float]] = ()
+    ) -> List[Tuple[float, float, str]]:
+        future = asyncio.get_running_loop().create_future()
+        jobs = self.pending.setdefault(model, [])
+        jobs.append((audio, list(excluded), future))
+        if len(jobs) >= self.max_jobs:
+            self._flush(model)
+        elif model not in self._timers:
+            self._timers[model] = asyncio.create_task(self._flush_later(model))
+        return await future
+
+    async def _flush_later(self, model: WhisperSpec):
+        await asyncio.sleep(self.max_wait)
+        self._timers.pop(model, None)
+        self._flush(model)
+
+    def _flush(self, model: WhisperSpec):
+        timer = self._timers.pop(model, None)
+        if timer and timer is not asyncio.current_task():
+            timer.cancel()
+        jobs = self.pending.pop(model, [])
+        if jobs:
+            task = asyncio.create_task(self._run(model, jobs))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, model: WhisperSpec, jobs: List[Tuple[np.ndarray, List, asyncio.Future]]):
+        logger.info(f"Running batched transcription of {len(jobs)} job(s) on {model[0]}")
+        try:
+            results = await transcription_executor.run(
+                transcribe_batch,
+                [audio for audio, _, _ in jobs],
+                model,
+                [excluded for _, excluded, _ in jobs]
+            )
+        except Exception as e:
+            for _, _, future in jobs:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), segments in zip(jobs, results):
+            if not future.done():
+                future.set_result(segments)
+
+batched_transcriber = BatchedTranscriber(WHISPER_BATCH_MAX_JOBS, WHISPER_BATCH_MAX_WAIT_SECONDS)
+
+async def stream_transcribe_loop(sess: "MeetingSession"):
+    """Transcribes a session's audio window by window until the recording stops."""
+    while not sess.stream_stop.is_set():
+        try:
+            await asyncio.wait_for(sess.stream_stop.wait(), timeout=STREAM_WINDOW_SECONDS)
+            break
+        except asyncio.TimeoutError:
+            pass
+
+        try:
+            before = sess.transcribed_until
+            await sess.advance_transcript()
+        except TranscriptionBusy:
+            logger.info(f"Session {sess.session_id}: transcription pool busy, deferring window")
+            continue
+        except Exception as e:
+            logger.error(f"Streaming transcription failed for {sess.session_id}: {e}")
+            continue
+
+        if sess.transcribed_until > before:
+            logger.info(f"Session {sess.session_id}: transcribed up to {sess.transcribed_until:.1f}s")
+            if sess.send_partials and sess.websocket:
+                try:
+                    await sess.websocket.send_json({
+                        "stage": "partial_transcript",
+                        "text": sess.partial_transcript,
+                        "transcribed_seconds": sess.transcribed_until
+                    })
+                except Exception:
+                    pass
+
+class PcmBuffer:
+    """Growable 16 kHz mono int16 PCM, half the size of the float32 audio Whisper consumes.
+
+    Sample positions count from the start of the recording; only those from `base` on are held,
+    since transcribed audio is discarded as the streaming windows move on.
+    """
+
+    def __init__(self, initial_seconds: int = 60):
+        self.initial_samples = initial_seconds * WHISPER_SAMPLE_RATE
+        self._data = np.zeros(self.initial_samples, dtype=np.int16)
+        self.base = 0  # Position of self._data[0]
+        self.samples = 0  # Position just past the last sample
+        self._lock = threading.Lock()
+
+    @property
+    def seconds(self) -> float:
+        return self.samples / WHISPER_SAMPLE_RATE
+
+    def append(self, pcm: np.ndarray):
+        with self._lock:
+            used = self.samples - self.base
+            needed = used + len(pcm)
+            if needed > len(self._data):
+                grown = np.zeros(max(needed, len(self._data) * 2), dtype=np.int16)
+                grown[:used] = self._data[:used]
+                self._data = grown
+            self._data[used:needed] = pcm
+            self.samples += len(pcm)
+
+    def discard_before(self, position: int):
+        """Frees the samples before `position`; they can no longer be read."""
+        with self._lock:
+            drop = min(position, self.samples) - self.base
+            if drop <= 0:
+                return
+            kept = self._data[drop:self.samples - self.base]
+            # A fresh array, so views handed out earlier keep their samples
+            self._data = np.zeros(max(len(kept), self.initial_samples), dtype=np.int16)
+            self._data[:len(kept)] = kept
+            self.base += drop
+
+    def to_float32(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        with self._lock:
+            if start < self.base:
+                raise ValueError(f"PCM before sample {self.base} was already discarded")
+            # Held samples never change in place, so the slice stays valid after a regrow or discard
+            stop = self.samples if end is None else min(end, self.samples)
+            view = self._data[start - self.base:max(start, stop) - self.base]
+        return view.astype(np.float32) / 32768.0
+
+class _ChunkPipe:
+    """Blocking read-only stream fed with ingest chunks.
+
+    It deliberately has no seek(), so PyAV demuxes it as a live stream.
+    """
+
+    def __init__(self):
+        self._chunks = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def feed(self, data: bytes):
+        with self._cond:
+            if self._closed:
+                return  # Nobody will read it
+            self._chunks.append(data)
+            self._cond.notify()
+
+    def close(self, discard: bool = False):
+        with self._cond:
+            self._closed = True
+            if discard:
+                self._chunks.clear()
+            self._cond.notify()
+
+    def read(self, size: int = -1) -> bytes:
+        with self._cond:
+            while not self._chunks and not self._closed:
+                self._cond.wait()
+            if not self._chunks:
+                return b""
+            data = self._chunks.popleft()
+            if 0 <= size < len(data):
+                self._chunks.appendleft(data[size:])
+                data = data[:size]
+            return data
+
+class StreamingDecoder:
+    """Decodes a session's WebM/Opus stream into a PcmBuffer on a background thread as chunks arrive."""
+
+    def __init__(self, pcm: PcmBuffer, name: str):
+        self.pcm = pcm
+        self.error: Optional[Exception] = None
+        self._pipe = _ChunkPipe()
+        self._thread = threading.Thread(target=self._run, name=f"decode-{name}", daemon=True)
+
+    @property
+    def healthy(self) -> bool:
+        return self.error is None
+
+    def feed(self, data: bytes):
+        if self._thread.ident is None:
+            self._thread.start()
+        self._pipe.feed(data)
+
+    def finish(self, timeout: float = 30.0) -> bool:
+        """Signals end of stream and waits for the decoder to drain. Returns True if all audio is in the PcmBuffer."""
+        self._pipe.close()
+        if self._thread.ident is not None:
+            self._thread.join(timeout)
+        return self.healthy and not self._thread.is_alive()
+
+    def close(self):
+        self._pipe.close()
+
+    def _run(self):
+        resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=WHISPER_SAMPLE_RATE)
+        try:
+            with av.open(self._pipe, mode="r", metadata_errors="ignore") as container:
+                stream = container.streams.audio[0]
+                # Decoding per packet keeps a bad packet from ending the decode generator
+                for packet in container.demux(stream):
+                    try:
+                        frames = packet.decode()
+                    except av.error.InvalidDataError:
+                        continue  # Skip packets cut by a lost chunk
+                    for frame in frames:
+                        frame.pts = None
+                        for out in resampler.resample(frame):
+                            self.pcm.append(out.to_ndarray().reshape(-1))
+                for out in resampler.resample(None):
+                    self.pcm.append(out.to_ndarray().reshape(-1))
+            if not self._pipe.closed:
+                raise RuntimeError("container ended before the recording did")
+        except Exception as e:
+            self.error = e
+            STREAM_DECODE_FAILURES.inc()
+            logger.warning(f"Streaming decode stopped ({self._thread.name}): {e}; falling back to full decode")
+        finally:
+            # Chunks fed from now on would never be read
+            self._pipe.close(discard=True)
+
+class ChunkReassembler:
+    """Puts sequence-numbered chunks back in order, holding a bounded window of early arrivals."""
+
+    def __init__(self, window: int = RESUME_WINDOW_CHUNKS, first_seq: int = 1):
+        self.next_seq = first_seq
+        self.window = window
+        self.pending: Dict[int, bytes] = {}
+
+    @property
+    def acked(self) -> int:
+        """Highest sequence number received with nothing missing before it."""
+        return self.next_seq - 1
+
+    def push(self, seq: int, data: bytes) -> List[bytes]:
+        """Returns the chunks that are now ready to append, in order (possibly none)."""
+        if seq < self.next_seq or seq in self.pending:
+            return []  # Re-sent after a reconnect, already have it
+        self.pending[seq] = data
+        if len(self.pending) > self.window:
+            # The gap is not coming back; skip it rather than stall ingest
+            lost_until = min(self.pending)
+            logger.warning(f"Chunks {self.next_seq}-{lost_until - 1} never arrived, skipping them")
+            self.next_seq = lost_until
+        ready = []
+        while self.next_seq in self.pending:
+            ready.append(self.pending.pop(self.next_seq))
+            self.next_seq += 1
+        return ready
+
+class MutingEvent(BaseModel):
+    timestamp: int
+    muted: bool
+
+class MeetingSession:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        # Shared sessions write to disk from the first chunk so another worker can pick the audio up
+        self.audio = AudioBuffer(spill_bytes=0 if SESSION_STORE == "sqlite" else AUDIO_SPILL_BYTES)
+        self.pcm = PcmBuffer()  # Decoded during ingest so stop does not pay a full decode pass
+        self.decoder = StreamingDecoder(self.pcm, session_id)
+        self.participants = []
+        self.title = "Live Meeting"
+        self.bytes_received = 0
+        self.max_bytes = MAX_AUDIO_BYTES
+        self.last_activity = time.time()
+        self.is_finalized = False
+        self.lock = asyncio.Lock()
+        self.mute_events: List[Dict] = []  # Track mute/unmute events
+        self.last_seq: Optional[int] = None  # Last chunk_seq seen, to log gaps
+        self.resumable = False  # Client opted in to acks, reordering and resume offsets
+        self.reassembler = ChunkReassembler()
+        self.announced_seq: Optional[int] = None  # chunk_seq of the next binary frame
+        self.synced_at = 0.0  # Monotonic time of the last publish to the shared session store
+        self.synced_segments = -1  # len(transcript_segments) at that publish
+        self.sync_lock = asyncio.Lock()
+        self.audio_hash = hashlib.sha256()  # Content hash of the received audio, for the result cache
+        self.is_recording = False  # Track if actively recording
+        self.transcript_segments: List[TranscriptSegment] = []  # Timed segments of windows already transcribed
+        self.transcribed_until = 0.0  # Seconds of audio covered by transcript_segments
+        self.transcribe_lock = asyncio.Lock()
+        self.stream_stop = asyncio.Event()
+        self.stream_task: Optional[asyncio.Task] = None
+        self.websocket: Optional[WebSocket] = None
+        self.send_partials = False  # Client opted in to partial_transcript frames
+        self.stream_analysis = False  # Client opted in to partial_summary / partial_task frames
+        self.whisper_model = WhisperRegistry.resolve()  # (size, compute type, profile), selectable via metadata
+        self.recording_started_at: Optional[float] = None  # Epoch ms of the first audio byte
+        self.skip_muted_audio = False  # Client captures the microphone only, so muted spans are silence
+
+    SHARED_FIELDS = (
+        "title", "participants", "bytes_received", "mute_events", "is_recording", "send_partials",
+        "skip_muted_audio", "recording_started_at", "transcribed_until", "resumable", "stream_analysis",
+    )
+
+    def snapshot(self) -> Dict:
+        """State other workers need to continue this session, except transcript_segments (stored apart)."""
+        state = {name: getattr(self, name) for name in self.SHARED_FIELDS}
+        state["whisper_model"] = list(self.whisper_model)
+        state["audio_path"] = self.audio.path
+        state["next_seq"] = self.reassembler.next_seq
+        return state
+
+    @classmethod
+    def restore(cls, session_id: str, state: Dict) -> "MeetingSession":
+        """Rebuilds a session another worker started. Call replay_audio() before feeding new chunks."""
+        sess = cls(session_id)
+        for name in cls.SHARED_FIELDS:
+            setattr(sess, name, state[name])
+        sess.whisper_model = WhisperRegistry.resolve(*state["whisper_model"])  # Older snapshots lack the profile
+        sess.reassembler.next_seq = state["next_seq"]
+        sess.transcript_segments = state.get("transcript_segments") or []
+        if state["audio_path"] and os.path.exists(state["audio_path"]):
+            # Only resumable clients re-send what the snapshot missed; other sessions publish every chunk
+            sess.audio = AudioBuffer.adopt(state["audio_path"], state["bytes_received"] if state["resumable"] else None)
+            sess.bytes_received = sess.audio.size
+        return sess
+
+    def replay_audio(self):
+        """Rebuilds the content hash and decoded PCM from adopted audio. Runs in a thread."""
+        if self.audio.size == 0:
+            return
+        with self.audio.reader() as f:
+            while data := f.read(1024 * 1024):
+                self.audio_hash.update(data)
+                self.decoder.feed(data)
+
+    def append_audio(self, chunk: bytes):
+        if self.recording_started_at is None:
+            self.recording_started_at = time.time() * 1000
+        self.audio.write(chunk)
+        self.decoder.feed(chunk)
+        self.audio_hash.update(chunk)
+        self.bytes_received += len(chunk)
+        INGEST_BYTES.inc(len(chunk), source="websocket")
+
+    @property
+    def partial_transcript(self) -> str:
+        return " ".join(text.strip() for _, _, text in self.transcript_segments)
+
+    def annotated_transcript(self) -> str:
+        """The transcript with mute markers aligned to the recording timeline, ready for the LLM."""
+        return " ".join(annotate_transcript(self.transcript_segments, self.muted_spans()))
+
+    def excluded_spans(self) -> List[Tuple[float, float]]:
+        """Spans left out of transcription: muted ones, when the client says they are silence."""
+        return self.muted_spans() if self.skip_muted_audio else []
+
+    def muted_spans(self) -> List[Tuple[float, float]]:
+        """Muted intervals in seconds from the start of the recording, from the mute timeline."""
+        if self.recording_started_at is None:
+            return []
+        spans = []
+        muted_since = None
+        for event in sorted(self.mute_events, key=lambda e: e["timestamp"] or 0):
+            at = max(0.0, ((event["timestamp"] or 0) - self.recording_started_at) / 1000)
+            if event["muted"] and muted_since is None:
+                muted_since = at
+            elif not event["muted"] and muted_since is not None:
+                spans.append((muted_since, at))
+                muted_since = None
+        if muted_since is not None:
+            spans.append((muted_since, float("inf")))
+        return spans
+
+    def start_streaming(self):
+        """Starts background transcription of settled audio windows (idempotent across reconnects)."""
+        if not STREAM_TRANSCRIPTION or self.stream_stop.is_set():
+            return
+        if self.stream_task is None or self.stream_task.done():
+            self.stream_task = asyncio.create_task(stream_transcribe_loop(self))
+
+    async def advance_transcript(self, final: bool = False):
+        """Transcribes audio received since the last window.
+
+        Non-final windows hold back the last few seconds, which may still be cut mid-word;
+        the final pass transcribes everything that remains.
+        """
+        async with self.transcribe_lock:
+            if self.audio.size == 0:
+                return
+            # In the stock duplex recorder, system audio is still captured while muted
+            excluded = self.excluded_spans()
+            # Decoded PCM when the streaming decoder kept up, otherwise decode the buffered container
+            use_pcm = self.decoder.healthy
+            if final and use_pcm:
+                use_pcm = await asyncio.to_thread(self.decoder.finish)
+
+            if final:
+                start = int(self.transcribed_until * WHISPER_SAMPLE_RATE)
+                if use_pcm:
+                    window = await asyncio.to_thread(self.pcm.to_float32, start)
+                else:
+                    window = (await transcription_executor.run(decode_buffer, self.audio))[start:]
+                offset = self.transcribed_until
+                if WHISPER_BATCHED:
+                    # The tail joins other sessions' final jobs in shared batched calls
+                    segments = await batched_transcriber.transcribe(
+                        window, self.whisper_model, [(s - offset, e - offset) for s, e in excluded]
+                    )
+                    segments = [(offset + start, offset + end, text) for start, end, text in segments]
+                else:
+                    # A long tail (streaming off or behind) is split across the workers
+                    segments = await transcribe_sharded(window, offset, self.whisper_model, excluded)
+                self.transcript_segments.extend(segments)
+                self.transcribed_until += len(window) / WHISPER_SAMPLE_RATE
+                return
+
+            segments, self.transcribed_until = await transcription_executor.run(
+                transcribe_pcm_window if use_pcm else transcribe_file_window,
+                self.pcm if use_pcm else self.audio,
+                self.transcribed_until,
+                False,
+                self.whisper_model,
+                STREAM_WINDOW_SECONDS,
+                excluded
+            )
+            self.transcript_segments.extend(segments)
+            if use_pcm:
+                self.pcm.discard_before(int(self.transcribed_until * WHISPER_SAMPLE_RATE))
+
+    def cleanup(self, keep_audio: bool = False):
+        """Stops background work and releases the audio; `keep_audio` leaves the file to another worker."""
+        self.stream_stop.set()
+        if self.stream_task and not self.stream_task.done():
+            self.stream_task.cancel()
+        self.decoder.close()
+        try:
+            if keep_audio:
+                self.audio.detach()
+            else:
+                self.audio.close()
+                logger.info(f"Cleaned up session audio: {self.session_id}")
+        except Exception as e:
+            logger.error(f"Cleanup failed for session {self.session_id}: {e}")
+
+class SessionStore:
+    """Session state shared between worker processes. The base store shares nothing (single worker)."""
+
+    shared = False
+
+    def owner(self, session_id: str) -> Optional[str]:
+        return None
+
+    def claim(self, session_id: str) -> Optional[Dict]:
+        """Makes this worker the session's owner and returns its last saved state, if any."""
+        return None
+
+    def save(self, session_id: str, state: str, segments: Optional[str] = None):
+        """Stores a JSON snapshot; `segments` (JSON) is only written when it is given."""
+        pass
+
+    def delete(self, session_id: str):
+        pass
+
+    def purge(self, before: float):
+        pass
+
+class SqliteSessionStore(SessionStore):
+    """Sessions in a local SQLite database (WAL mode) that every worker on the host opens."""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, owner TEXT NOT NULL, state TEXT NOT NULL, updated_at REAL NOT NULL, segments TEXT)"
+        )
+        with contextlib.suppress(sqlite3.OperationalError):
+            self.db.execute("ALTER TABLE sessions ADD COLUMN segments TEXT")  # Databases from before the column
+        self.db.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self.db.commit()
+        self._lock = threading.Lock()
+
+    def owner(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self.db.execute("SELECT owner FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.db.execute("SELECT state, segments FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE sessions SET owner = ?, updated_at = ? WHERE id = ?", (WORKER_ID, time.time(), session_id)
+            )
+            self.db.commit()
+        state = json.loads(row[0])
+        state["transcript_segments"] = json.loads(row[1]) if row[1] else []
+        return state
+
+    def save(self, session_id: str, state: str, segments: Optional[str] = None):
+        # A worker that lost the session to a reconnect elsewhere must not overwrite the new owner's state
+        with self._lock:
+            self.db.execute(
+                "INSERT INTO sessions (id, owner, state, updated_at, segments) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at, "
+                "segments = COALESCE(excluded.segments, segments) "
+                "WHERE owner = excluded.owner",
+                (session_id, WORKER_ID, state, time.time(), segments)
+            )
+            self.db.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self.db.commit()
+
+    def purge(self, before: float):
+        """Drops sessions whose owning worker went away without cleaning up, with their audio."""
+        with self._lock:
+            rows = self.db.execute("SELECT id, state FROM sessions WHERE updated_at < ?", (before,)).fetchall()
+            for session_id, state in rows:
+                audio_path = json.loads(state).get("audio_path")
+                if audio_path:
+                    _remove_file(audio_path)
+                self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self.db.commit()
+
+def create_session_store() -> SessionStore:
+    if SESSION_STORE == "sqlite":
+        return SqliteSessionStore(SESSION_DB_PATH)
+    return SessionStore()
+
+class SessionManager:
+    """This worker's live sessions, expired in deadline order rather than by scanning them all."""
+
+    def __init__(self, store: SessionStore):
+        self.sessions: Dict[str, MeetingSession] = {}
+        self.store = store
+        # Min-heap of (deadline, session_id, id(session)), one entry per live session.
+        # Activity only moves last_activity; entries are re-queued when they come due early.
+        self._deadlines: List[Tuple[float, str, int]] = []
+
+    @staticmethod
+    def timeout(sess: MeetingSession) -> float:
+        # 10 minutes timeout for active recording, 5 minutes for inactive
+        return SESSION_RECORDING_TIMEOUT_SECONDS if sess.is_recording else SESSION_IDLE_TIMEOUT_SECONDS
+
+    async def get_or_create(self, session_id: str) -> MeetingSession:
+        sess = self.sessions.get(session_id)
+        if sess is not None and await asyncio.to_thread(self.store.owner, session_id) not in (None, WORKER_ID):
+            # The client reconnected to another worker in the meantime; its copy is the current one
+            self.sessions.pop(session_id)
+            sess.cleanup(keep_audio=True)
+            sess = None
+        if sess is None:
+            state = await asyncio.to_thread(self.store.claim, session_id)
+            if state is not None:
+                sess = MeetingSession.restore(session_id, state)
+                await asyncio.to_thread(sess.replay_audio)
+                logger.info(f"Session {session_id} taken over from the shared session store")
+            else:
+                sess = MeetingSession(session_id)
+            self.sessions[session_id] = sess
+            heapq.heappush(self._deadlines, (sess.last_activity + self.timeout(sess), session_id, id(sess)))
+            await self.sync(sess, force=True)
+        return sess
+
+    async def sync(self, sess: MeetingSession, force: bool = False):
+        """Publishes the session's state (and flushed audio) to the other workers.
+
+        Audio-only progress of resumable sessions goes out at most every SESSION_SYNC_INTERVAL_SECONDS,
+        since their client re-sends anything a takeover lost; other sessions, and `force` (metadata and
+        mute changes), publish at once. Transcript segments are re-sent only when new ones arrived.
+        """
+        if not self.store.shared:
+            return
+        now = time.monotonic()
+        if not force and sess.resumable and now - sess.synced_at < SESSION_SYNC_INTERVAL_SECONDS:
+            return
+        sess.synced_at = now
+        state = json.dumps(sess.snapshot())
+        segments = None
+        if len(sess.transcript_segments) != sess.synced_segments:
+            sess.synced_segments = len(sess.transcript_segments)
+            segments = json.dumps(sess.transcript_segments)
+        async with sess.sync_lock:  # Keeps publishes in order
+            await asyncio.to_thread(self._publish, sess, state, segments)
+
+    def _publish(self, sess: MeetingSession, state: str, segments: Optional[str]):
+        sess.audio.flush()
+        self.store.save(sess.session_id, state, segments)
+
+    async def remove(self, session_id: str, cleanup: bool = True):
+        """Forgets a session here and in the shared store; `cleanup` also deletes its audio."""
+        sess = self.sessions.pop(session_id, None)
+        await asyncio.to_thread(self.store.delete, session_id)
+        if sess is not None and cleanup:
+            sess.cleanup()
+
+    async def expire(self, now: float):
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, sid, ident = heapq.heappop(self._deadlines)
+            sess = self.sessions.get(sid)
+            if sess is None or id(sess) != ident:
+                continue  # Already removed (or replaced by a newer session with the same id)
+            deadline = sess.last_activity + self.timeout(sess)
+            if deadline > now:
+                heapq.heappush(self._deadlines, (deadline, sid, ident))
+                continue
+            logger.info(f"Purging stale session: {sid}")
+            # Forget it before awaiting the store, so a reconnect meanwhile starts a fresh session
+            self.sessions.pop(sid)
+            if await asyncio.to_thread(self.store.owner, sid) in (None, WORKER_ID):
+                await asyncio.to_thread(self.store.delete, sid)
+                sess.cleanup()
+            else:
+                sess.cleanup(keep_audio=True)
+
+    async def cleanup_loop(self):
+        while True:
+            now = time.time()
+            await self.expire(now)
+            await asyncio.to_thread(self.store.purge, now - 2 * SESSION_RECORDING_TIMEOUT_SECONDS)
+            # Wake at the earliest deadline; new sessions can only add later ones, but cap the nap anyway
+            delay = self._deadlines[0][0] - now if self._deadlines else 60
+            await asyncio.sleep(min(max(delay, 1), 60))
+
+session_manager = SessionManager(create_session_store())
+
+async def finalize_session_transcript(sess: MeetingSession) -> str:
+    """Transcribes what streaming has not covered yet and returns the annotated session transcript."""
+    sess.stream_stop.set()
+    cache_key = segments_cache_key(sess.audio_hash.hexdigest(), sess.whisper_model, sess.excluded_spans())
+    cached = await result_cache.get(cache_key) if result_cache else None
+    if cached is not None:
+        sess.transcript_segments = [tuple(segment) for segment in json.loads(cached)]
+    else:
+        with STAGE_SECONDS.time(stage="transcribe"):
+            await sess.advance_transcript(final=True)
+        if result_cache:
+            await result_cache.set(cache_key, json.dumps(sess.transcript_segments))
+    return sess.annotated_transcript()
+
+class WarmUp:
+    """Pays cold-start costs at startup: Whisper's first inference, loading the LLMs and their
+    SYSTEM_PROMPT prefix into each Ollama server, then keeps the LLMs loaded."""
+
+    def __init__(self):
+        self.ready = not WARMUP_ENABLED
+        self.status: Dict[str, object] = {}
+
+    def llm_models(self) -> List[str]:
+        return [OLLAMA_MODEL] + ([OLLAMA_SMALL_MODEL] if OLLAMA_SMALL_MODEL else [])
+
+    @staticmethod
+    def native_url(backend: LlmBackend) -> str:
+        """Ollama's own API lives next to the OpenAI-compatible /v1 one."""
+        return re.sub(r"/v1/?$", "", backend.base_url)
+
+    def warm_whisper(self, size: Optional[str] = None):
+        """Runs one short inference so CTranslate2 initializes now rather than on the first meeting."""
+        model = WhisperRegistry.resolve(size)
+        t = np.arange(WHISPER_SAMPLE_RATE, dtype=np.float32) / WHISPER_SAMPLE_RATE
+        clip = (0.1 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        with whisper_registry.use(*model) as whisper_model:
+            segments, _ = whisper_model.transcribe(clip, **decode_options(model))
+            list(segments)
+
+    async def check_models(self, backend: LlmBackend) -> List[str]:
+        """Models we need that the backend's /api/tags does not list (matching loosely, e.g. llama3.1 ~ llama3.1:8b)."""
+        response = await http_client.get(f"{self.native_url(backend)}/api/tags", timeout=LLM_CONNECT_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        available = [m["name"] for m in response.json().get("models", [])]
+        return [model for model in self.llm_models() if not any(model in name for name in available)]
+
+    async def warm_llm(self, backend: LlmBackend, model: str):
+        # Same system prompt prefix as real calls, so Ollama's prompt cache already holds it
+        await backend.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": "Reply with {}"}
+            ],
+            max_tokens=1,
+            extra_body={"keep_alive": LLM_KEEP_ALIVE}
+        )
+
+    async def keep_alive(self, backend: LlmBackend):
+        for model in self.llm_models():
+            # A generate request without a prompt just loads the model and resets its unload timer
+            await http_client.post(
+                f"{self.native_url(backend)}/api/generate",
+                json={"model": model, "keep_alive": LLM_KEEP_ALIVE},
+                timeout=LLM_TIMEOUT_SECONDS
+            )
+
+    async def run(self):
+        started = time.time()
+        whisper_sizes = [None] + WHISPER_PREWARM
+
+        async def whisper():
+            for size in whisper_sizes:
+                try:
+                    await asyncio.to_thread(self.warm_whisper, size)
+                except Exception as e:
+                    logger.error(f"Whisper warm-up failed for {size or WHISPER_MODEL_SIZE}: {e}")
+                    self.status["whisper"] = f"failed: {e}"
+                    return
+            self.status["whisper"] = "warm"
+
+        async def llm(backend: LlmBackend):
+            try:
+                missing = await self.check_models(backend)
+                if missing:
+                    logger.warning(f"LLM backend {backend.base_url} does not list {missing}; they may be aliased")
+                for model in self.llm_models():
+                    await self.warm_llm(backend, model)
+                # Servers that ignore keep_alive on /v1 still get the long timer from the native API
+                await self.keep_alive(backend)
+                self.status[backend.base_url] = {"state": "warm", "missing_models": missing}
+            except Exception as e:
+                logger.error(f"LLM warm-up failed on {backend.base_url}: {e}")
+                self.status[backend.base_url] = {"state": f"failed: {e}"}
+
+        await asyncio.gather(whisper(), *(llm(backend) for backend in llm_router.backends))
+        self.ready = True
+        logger.info(f"Warm-up finished in {time.time() - started:.1f}s")
+
+    async def keep_alive_loop(self):
+        while True:
+            await asyncio.sleep(LLM_KEEP_ALIVE_INTERVAL_SECONDS)
+            for backend in llm_router.backends:
+                if backend.ejected:
+                    continue
+                try:
+                    await self.keep_alive(backend)
+                except Exception as e:
+                    logger.warning(f"LLM keep-alive failed on {backend.base_url}: {e}")
+
+warmup = WarmUp()
+
+@app.on_event("startup")
+async def startup_event():
+    asyncio.create_task(session_manager.cleanup_loop())
+    email_dispatcher.start()
+    asyncio.create_task(job_store.purge_loop())
+    asyncio.create_task(whisper_registry.evict_loop())
+    asyncio.create_task(llm_router.probe_loop())
+    if WARMUP_ENABLED:
+        # In the background so startup stays instant; /health and /ready report when it is done
+        asyncio.create_task(warmup.run())
+        asyncio.create_task(warmup.keep_alive_loop())
+    elif WHISPER_PREWARM:
+        asyncio.create_task(asyncio.to_thread(whisper_registry.prewarm, WHISPER_PREWARM))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await http_client.aclose()
+
+@contextlib.asynccontextmanager
+async def secure_temp_file(suffix: str = ".webm"):
+    """Context manager for secure temporary files with auto-cleanup."""
+    file_id = uuid.uuid4()
+    path = os.path.join(AUDIO_TEMP_DIR, f"temp_{file_id}{suffix}")
+    try:
+        yield path
+    finally:
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+                logger.info(f"Cleaned up temp file: {path}")
+            except Exception as e:
+                logger.error(f"Failed to delete temp file {path}: {e}")
+
+# Sentence ends and line breaks; the separator stays attached to the preceding piece
+_BOUNDARY_RE = re.compile(r"((?<=[.!?])\s+|\n+)")
+
+@functools.lru_cache(maxsize=8)
+def get_encoder(model: str):
+    """Returns the tiktoken encoder for a model, falling back to cl100k_base for local models."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def chunk_transcript(
+    text: str,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    model: str = OLLAMA_MODEL
+) -> List[TranscriptChunk]:
+    """Chunks transcript for LLM analysis on sentence/line boundaries within a token budget.
+
+    Every piece is encoded once, so the cost is linear in transcript length. Chunk token
+    counts are the sum of their pieces, which is within a few tokens of a full re-encode.
+    """
+    encoder = get_encoder(model)
+    parts = _BOUNDARY_RE.split(text)
+    pieces = ["".join(parts[i:i + 2]) for i in range(0, len(parts), 2)]
+    pieces = [p for p in pieces if p]
+    counts = encoder.encode_ordinary_batch(pieces)
+
+    chunks: List[TranscriptChunk] = []
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+
+    def flush():
+        chunks.append(TranscriptChunk(text="".join(p for p, _ in current), token_count=current_tokens))
+
+    for piece, tokens in zip(pieces, counts):
+        if len(tokens) > max_tokens:
+            # A single run-on piece larger than the budget: fall back to token windows
+            split = [(encoder.decode(tokens[i:i + max_tokens]), len(tokens[i:i + max_tokens]))
+                     for i in range(0, len(tokens), max_tokens)]
+        else:
+            split = [(piece, len(tokens))]
+
+        for piece_text, n in split:
+            if current and current_tokens + n > max_tokens:
+                flush()
+                # Carry trailing pieces into the next chunk as overlap
+                carried: List[Tuple[str, int]] = []
+                carried_tokens = 0
+                for prev in reversed(current):
+                    if carried_tokens + prev[1] > overlap_tokens or carried_tokens + prev[1] + n > max_tokens:
+                        break
+                    carried.insert(0, prev)
+                    carried_tokens += prev[1]
+                current, current_tokens = carried, carried_tokens
+            current.append((piece_text, n))
+            current_tokens += n
+
+    if current or not chunks:
+        flush()
+    return chunks
+
+async def llm_chat(
+    messages: List[Dict],
+    timeout: Optional[float] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
+    model: Optional[str] = None,
+    **kwargs
+) -> str:
+    """Runs a chat completion on the least-loaded Ollama backend. Returns the message content.
+
+    Connection errors, timeouts and 5xx responses move the call to another backend as long as
+    no output has been streamed yet; once every backend has failed, all are retried up to
+    LLM_RETRY_ROUNDS more times with backoff. The reply is streamed so time to first token and
+    token usage can be recorded; `on_delta` sees each piece of content as it arrives.
+    """
+    tried: List[LlmBackend] = []
+    rounds = 0
+    last_error: Exception = RuntimeError("No LLM backends configured")
+    while True:
+        backend = llm_router.pick(tried)
+        if backend is None:
+            if not llm_router.backends or rounds >= LLM_RETRY_ROUNDS:
+                raise last_error
+            await asyncio.sleep(LLM_RETRY_BACKOFF_SECONDS * 2 ** rounds)
+            rounds += 1
+            tried = []
+            continue
+        tried.append(backend)
+        backend.outstanding += 1
+        try:
+            if not await backend.acquire(lambda: llm_router.has_healthy_besides(backend)):
+                LLM_FAILOVERS.inc(backend=backend.base_url)
+                last_error = APIConnectionError(message=f"{backend.base_url} was ejected", request=None)
+                continue
+            try:
+                return await _llm_chat_on(backend, messages, timeout, on_delta, model or OLLAMA_MODEL, **kwargs)
+            finally:
+                backend.semaphore.release()
+        except LLM_RETRYABLE_ERRORS as e:
+            backend.record_failure(e)
+            if getattr(e, "streamed", False):
+                raise
+            LLM_FAILOVERS.inc(backend=backend.base_url)
+            logger.warning(f"LLM call failed on {backend.base_url}, retrying: {e}")
+            last_error = e
+        finally:
+            backend.outstanding -= 1
+
+async def _llm_chat_on(
+    backend: LlmBackend,
+    messages: List[Dict],
+    timeout: Optional[float],
+    on_delta: Optional[Callable[[str], None]],
+    model: str,
+    **kwargs
+) -> str:
+    LLM_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    outcome = "error"
+    parts = []
+    try:
+        try:
+            stream = await backend.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=timeout or LLM_TIMEOUT_SECONDS,
+                stream=True,
+                stream_options={"include_usage": True},
+                extra_body={"keep_alive": LLM_KEEP_ALIVE},
+                **kwargs
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        LLM_TTFT_SECONDS.observe(time.perf_counter() - started)
+                    parts.append(chunk.choices[0].delta.content)
+                    if on_delta:
+                        on_delta(chunk.choices[0].delta.content)
+                if chunk.usage:
+                    LLM_TOKENS.inc(chunk.usage.prompt_tokens, kind="prompt")
+                    LLM_TOKENS.inc(chunk.usage.completion_tokens, kind="completion")
+        except LLM_RETRYABLE_ERRORS as e:
+            # Output already passed to on_delta cannot be taken back, so no failover then
+            e.streamed = bool(parts)
+            raise
+        outcome = "ok"
+        backend.record_success(time.perf_counter() - started)
+    finally:
+        LLM_IN_FLIGHT.dec()
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+    return "".join(parts)
+
+class IncrementalJsonParser:
+    """Scans JSON as it streams in and reports every value the moment it is complete.
+
+    `on_value(path, raw)` gets the value's path (object keys and array indexes from the root)
+    and its raw JSON text. Malformed input is not an error here; it simply reports less.
+    """
+
+    def __init__(self, on_value: Callable[[Tuple, str], None]):
+        self.on_value = on_value
+        self.buffer = ""
+        self.stack: List[Dict] = []  # Open containers: {"kind", "start", "at", "expect_key"}
+        self.in_string = False
+        self.escaped = False
+        self.string_start = 0
+
+    def path(self) -> Tuple:
+        return tuple(frame["at"] for frame in self.stack)
+
+    def feed(self, text: str):
+        start = len(self.buffer)
+        self.buffer += text
+        for pos in range(start, len(self.buffer)):
+            c = self.buffer[pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                    raw = self.buffer[self.string_start:pos + 1]
+                    frame = self.stack[-1] if self.stack else None
+                    if frame and frame["expect_key"]:
+                        frame["at"] = json.loads(raw)
+                    else:
+                        self.on_value(self.path(), raw)
+            elif c == '"':
+                self.in_string = True
+                self.string_start = pos
+            elif c in "{[":
+                self.stack.append({"kind": c, "start": pos, "at": 0 if c == "[" else None, "expect_key": c == "{"})
+            elif c in "}]" and self.stack:
+                frame = self.stack.pop()
+                self.on_value(self.path(), self.buffer[frame["start"]:pos + 1])
+            elif self.stack and c == ":":
+                self.stack[-1]["expect_key"] = False
+            elif self.stack and c == ",":
+                frame = self.stack[-1]
+                if frame["kind"] == "{":
+                    frame["expect_key"] = True
+                else:
+                    frame["at"] += 1
+
+def analysis_stream_parser(on_event: Callable[[Dict], None]) -> IncrementalJsonParser:
+    """Turns a streamed SYSTEM_PROMPT reply into summary and task events as soon as each is complete."""
+    people: Dict[int, Dict] = {}
+
+    def on_value(path: Tuple, raw: str):
+        try:
+            if path == ("meeting_summary",):
+                on_event({"type": "summary", "text": json.loads(raw)})
+            elif len(path) == 3 and path[0] == "participants" and path[2] in ("name", "email"):
+                people.setdefault(path[1], {})[path[2]] = json.loads(raw)
+            elif len(path) == 4 and path[0] == "participants" and path[2] == "tasks":
+                task = json.loads(raw)
+                person = people.get(path[1], {})
+                on_event({
+                    "type": "task",
+                    "participant": person.get("name"),
+                    "email": person.get("email"),
+                    "task": task.get("task"),
+                    "deadline": task.get("deadline")
+                })
+        except (ValueError, AttributeError):
+            pass  # Fragment the final validation will deal with
+
+    return IncrementalJsonParser(on_value)
+
+def emit_result_events(result: "ProcessingResult", on_event: Callable[[Dict], None]):
+    """Replays a finished result as events, for cache hits and the map-reduce path."""
+    on_event({"type": "summary", "text": result.meeting_summary})
+    for participant in result.participants:
+        for task in participant.tasks:
+            on_event({
+                "type": "task",
+                "participant": participant.name,
+                "email": participant.email,
+                "task": task.task,
+                "deadline": task.deadline
+            })
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+def _close_json(text: str) -> str:
+    """Closes the string and containers a truncated reply left open."""
+    stack = []
+    in_string = escaped = False
+    for c in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append(c)
+        elif c in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join("}" if c == "{" else "]" for c in reversed(stack))
+
+def repair_json(content: str) -> Optional[Dict]:
+    """Cheap local fixes for near-valid JSON: code fences, prose around the object, trailing commas, truncation."""
+    fence = _FENCE_RE.search(content)
+    text = fence.group(1) if fence else content
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = text[start:]
+    end = text.rfind("}")
+    candidates = ([text[:end + 1]] if end >= 0 else []) + [_close_json(text)]
+    for candidate in candidates:
+        try:
+            value = json.loads(_TRAILING_COMMA_RE.sub(r"\1", candidate))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+def parse_llm_json(content: str) -> Dict:
+    """Parses a JSON object from LLM output, repairing common near-misses locally.
+
+    Valid JSON that is not an object (e.g. a bare list) counts as a failure too.
+    """
+    try:
+        value = json.loads(content)
+    except json.JSONDecodeError:
+        value = None
+    if isinstance(value, dict):
+        return value
+    logger.warning(f"LLM reply is not a JSON object, attempting cleanup. Content: {content[:100]}...")
+    repaired = repair_json(content)
+    if repaired is not None:
+        LLM_JSON_REPAIRS.inc(outcome="repaired")
+        return repaired
+    LLM_JSON_REPAIRS.inc(outcome="failed")
+    raise HTTPException(status_code=500, detail="LLM failed to produce valid JSON")
+
+def response_format_for(schema: Type[BaseModel]) -> Dict:
+    if not LLM_STRUCTURED_OUTPUT:
+        return {"type": "json_object"}
+    return {"type": "json_schema", "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()}}
+
+async def llm_json(
+    messages: List[Dict],
+    schema: Type[BaseModel],
+    on_delta: Optional[Callable[[str], None]] = None,
+    model: Optional[str] = None
+) -> Dict:
+    """Chat completion constrained to `schema` and parsed locally.
+
+    A reply that cannot be repaired is sent back on its own for the model to fix, which is
+    far cheaper than re-running the prompt with the whole transcript.
+    """
+    content = await llm_chat(messages, on_delta=on_delta, model=model, response_format=response_format_for(schema))
+    try:
+        return parse_llm_json(content)
+    except HTTPException:
+        try:
+            json.loads(content)
+            error = "not a JSON object"
+        except json.JSONDecodeError as e:
+            error = str(e)
+        logger.warning(f"Asking the LLM to fix its malformed JSON ({error})")
+        LLM_JSON_REPAIRS.inc(outcome="reasked")
+        fixed = await llm_chat(
+            [
+                {"role": "system", "content": REPAIR_PROMPT},
+                {"role": "user", "content": f"Parser error: {error}\n\nJSON:\n{content}"}
+            ],
+            model=model,
+            response_format=response_format_for(schema)
+        )
+        return parse_llm_json(fixed)
+
+def build_processing_result(result_json: Dict, transcript: str, participants_json: str) -> ProcessingResult:
+    """Validates LLM output into a ProcessingResult, falling back to the input participants."""
+    # Fast path: output that matches the schema needs no cleanup
+    try:
+        output = AnalysisOutput.model_validate(result_json)
+        if output.participants:
+            return ProcessingResult(
+                meeting_summary=output.meeting_summary,
+                transcript=transcript,
+                participants=[p.model_dump() for p in output.participants]
+            )
+    except ValidationError:
+        pass
+
+    # Validate and clean participant data
+    input_participants = json.loads(participants_json)
+    cleaned_participants = []
+
+    for p in result_json.get("participants", []):
+        # Skip participants with null/None values
+        if not p.get("name") or not p.get("email"):
+            logger.warning(f"Skipping participant with missing data: {p}")
+            continue
+
+        # Ensure tasks is a list
+        if "tasks" not in p or p["tasks"] is None:
+            p["tasks"] = []
+
+        cleaned_participants.append(p)
+
+    # If no valid participants from LLM, use input participants with empty tasks
+    if not cleaned_participants and input_participants:
+        logger.warning("LLM returned no valid participants. Using input participants with empty tasks.")
+        cleaned_participants = [
+            {
+                "name": p.get("name", "Unknown"),
+                "email": p.get("email", "unknown@example.com"),
+                "tasks": []
+            }
+            for p in input_participants
+            if p.get("email")  # Only include if email exists
+        ]
+
+    result_json["participants"] = cleaned_participants
+    result_json["transcript"] = transcript  # Add the full transcript to the result
+
+    try:
+        return ProcessingResult(**result_json)
+    except Exception as e:
+        logger.error(f"Failed to validate ProcessingResult: {e}")
+        logger.error(f"Result JSON: {json.dumps(result_json, indent=2)}")
+        # Fallback: return empty result with summary
+        return ProcessingResult(
+            meeting_summary=result_json.get("meeting_summary", "Meeting summary unavailable."),
+            transcript=transcript,
+            participants=[
+                Participant(name=p["name"], email=p["email"], tasks=p.get("tasks", []))
+                for p in cleaned_participants
+            ]
+        )
+
+def _normalize_task(text: str) -> str:
+    return " ".join("".join(c for c in text.lower() if c.isalnum() or c.isspace()).split())
+
+def merge_chunk_tasks(partials: List[Dict], participants_json: str) -> List[Dict]:
+    """Reduce step: assigns chunk tasks to input participants and drops duplicates.
+
+    Chunks overlap, so the same action item is often extracted twice; tasks are compared
+    case- and punctuation-insensitively per participant, keeping the first deadline seen.
+    """
+    participants = [
+        {"name": p.get("name", "Unknown"), "email": p["email"], "tasks": []}
+        for p in json.loads(participants_json)
+        if p.get("email")
+    ]
+    by_owner = {}
+    for p in participants:
+        by_owner[p["email"].lower()] = p
+        by_owner.setdefault(p["name"].lower(), p)
+
+    seen: Dict[Tuple[str, str], Dict] = {}
+    unassigned = 0
+    for partial in partials:
+        for t in partial.get("tasks") or []:
+            if not isinstance(t, dict) or not t.get("task"):
+                continue
+            owner = by_owner.get(str(t.get("owner") or "").strip().lower())
+            if owner is None:
+                unassigned += 1
+                continue
+            key = (owner["email"], _normalize_task(t["task"]))
+            if key in seen:
+                if not seen[key]["deadline"] and t.get("deadline"):
+                    seen[key]["deadline"] = t["deadline"]
+                continue
+            task = {"task": t["task"], "deadline": t.get("deadline")}
+            seen[key] = task
+            owner["tasks"].append(task)
+
+    if unassigned:
+        logger.info(f"Dropped {unassigned} unassigned task(s) during reduce")
+    return participants
+
+async def extract_chunk(index: int, total: int, chunk: TranscriptChunk, participants_json: str) -> Dict:
+    """Map step: extracts summary points and tasks from one transcript chunk."""
+    return await llm_json(
+        [
+            {"role": "system", "content": CHUNK_PROMPT},
+            {"role": "user", "content": f"Participants list: {participants_json}\n\nTranscript part {index + 1} of {total}:\n{chunk.text}"}
+        ],
+        ChunkOutput
+    )
+
+async def map_reduce_analysis(
+    chunks: List[TranscriptChunk],
+    participants_json: str,
+    on_event: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """Analyzes chunks concurrently, then merges them into a single result JSON.
+
+    With `on_event`, each chunk's new tasks are reported as soon as that chunk is analyzed,
+    and the summary as the reduce call streams it.
+    """
+    emitted = set()
+
+    async def extract(index: int, chunk: TranscriptChunk) -> Dict:
+        partial = await extract_chunk(index, len(chunks), chunk, participants_json)
+        if on_event:
+            for person in merge_chunk_tasks([partial], participants_json):
+                for task in person["tasks"]:
+                    key = (person["email"], _normalize_task(task["task"]))
+                    if key not in emitted:  # Overlapping chunks repeat tasks
+                        emitted.add(key)
+                        on_event({
+                            "type": "task",
+                            "participant": person["name"],
+                            "email": person["email"],
+                            "task": task["task"],
+                            "deadline": task["deadline"]
+                        })
+        return partial
+
+    outcomes = await asyncio.gather(
+        *[extract(i, chunk) for i, chunk in enumerate(chunks)],
+        return_exceptions=True
+    )
+    partials = []
+    for i, outcome in enumerate(outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Chunk {i + 1}/{len(chunks)} analysis failed: {outcome}")
+        else:
+            partials.append(outcome)
+    if not partials:
+        raise HTTPException(status_code=500, detail="LLM failed to analyze transcript")
+
+    points = [str(point) for partial in partials for point in partial.get("summary_points") or []]
+    try:
+        summary = (await llm_json(
+            [
+                {"role": "system", "content": REDUCE_PROMPT},
+                {"role": "user", "content": "Notes in meeting order:\n" + "\n".join(f"- {p}" for p in points)}
+            ],
+            ReduceOutput,
+            on_delta=analysis_stream_parser(on_event).feed if on_event else None
+        )).get("meeting_summary")
+    except Exception as e:
+        logger.error(f"Summary reduce failed, using raw notes: {e}")
+        summary = None
+
+    if not summary:
+        summary = "\n".join(f"- {p}" for p in points) or "Meeting summary unavailable."
+        if on_event:
+            on_event({"type": "summary", "text": summary})
+    return {"meeting_summary": summary, "participants": merge_chunk_tasks(partials, participants_json)}
+
+def use_small_model(token_count: int, participants_json: str) -> bool:
+    """Short meetings with few participants start on OLLAMA_SMALL_MODEL."""
+    return (
+        bool(OLLAMA_SMALL_MODEL)
+        and token_count <= CASCADE_MAX_TOKENS
+        and len(json.loads(participants_json)) <= CASCADE_MAX_PARTICIPANTS
+    )
+
+def escalation_reason(result_json: Dict) -> Optional[str]:
+    """Why a small-model analysis should be redone by OLLAMA_MODEL, or None to accept it."""
+    try:
+        output = AnalysisOutput.model_validate(result_json)
+    except ValidationError:
+        return "invalid"
+    if not output.meeting_summary.strip():
+        return "empty_summary"
+    if not output.participants:
+        return "no_participants"
+    if not any(p.tasks for p in output.participants):
+        return "no_tasks"
+    return None
+
+async def analyze_transcript(
+    transcript: str,
+    participants_json: str,
+    on_event: Optional[Callable[[Dict], None]] = None
+) -> ProcessingResult:
+    """Core analysis logic using LLM.
+
+    Transcripts that fit in one chunk are analyzed in a single call; longer ones go through
+    a concurrent map-reduce over chunk_transcript output so nothing is truncated.
+    Short, simple single-chunk transcripts try OLLAMA_SMALL_MODEL first and escalate to
+    OLLAMA_MODEL when its answer looks unreliable.
+    With `on_event`, the summary and each task are reported as soon as they are known.
+    """
+    cache_key = analysis_cache_key(transcript, participants_json)
+    if result_cache:
+        cached = await result_cache.get(cache_key)
+        if cached is not None:
+            result = ProcessingResult.model_validate_json(cached)
+            if on_event:
+                emit_result_events(result, on_event)
+            return result
+
+    started = time.perf_counter()
+    chunks = chunk_transcript(transcript)
+
+    streamed = False
+    if len(chunks) > 1:
+        logger.info(f"Analyzing transcript in {len(chunks)} chunks ({[c.token_count for c in chunks]} tokens)")
+        LLM_CASCADE.inc(decision="large")
+        result_json = await map_reduce_analysis(chunks, participants_json, on_event)
+        streamed = True
+    else:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Participants list: {participants_json}\n\nTranscript:\n{transcript}"}
+        ]
+        result_json = None
+        if use_small_model(chunks[0].token_count, participants_json):
+            # Not streamed: an answer that gets escalated must not reach the client
+            try:
+                result_json = await llm_json(messages, AnalysisOutput, model=OLLAMA_SMALL_MODEL)
+                reason = escalation_reason(result_json)
+            except Exception as e:
+                logger.warning(f"Small model analysis failed: {e}")
+                reason = "error"
+            if reason:
+                logger.info(f"Escalating analysis from {OLLAMA_SMALL_MODEL} to {OLLAMA_MODEL} ({reason})")
+                LLM_CASCADE.inc(decision="escalated")
+                LLM_ESCALATIONS.inc(reason=reason)
+                result_json = None
+            else:
+                LLM_CASCADE.inc(decision="small")
+        else:
+            LLM_CASCADE.inc(decision="large")
+
+        if result_json is None:
+            parser = analysis_stream_parser(on_event) if on_event else None
+            result_json = await llm_json(messages, AnalysisOutput, on_delta=parser.feed if parser else None)
+            streamed = True
+
+    result = build_processing_result(result_json, transcript, participants_json)
+    if on_event and not streamed:
+        emit_result_events(result, on_event)
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="analyze")
+    if result_cache:
+        await result_cache.set(cache_key, result.model_dump_json())
+
+    # Email cleanup/memory management
+    del chunks
+    gc.collect()
+
+    return result
+
+@contextlib.asynccontextmanager
+async def forward_events(send):
+    """Yields a plain callback that queues events; a pump task awaits `send(event)` for each, in order."""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        while (event := await queue.get()) is not None:
+            with contextlib.suppress(Exception):
+                await send(event)
+
+    task = asyncio.create_task(pump())
+    try:
+        yield queue.put_nowait
+    finally:
+        queue.put_nowait(None)
+        await task
+
+async def run_until_disconnect(websocket: WebSocket, coro):
+    """Awaits coro while watching the socket, cancelling it if the client disconnects first."""
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            watcher = asyncio.create_task(websocket.receive())
+            done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if task in done:
+                watcher.cancel()
+                return task.result()
+            if watcher.result()["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect()
+            # Late chunks or control messages after stop are ignored
+    finally:
+        if not task.done():
+            task.cancel()
+
+@app.websocket("/ws/record/{session_id}")
+async def websocket_record(websocket: WebSocket, session_id: str):
+    await websocket.accept()
+    sess = await session_manager.get_or_create(session_id)
+    sess.websocket = websocket
+    logger.info(f"WebSocket connected for session: {session_id}")
+    
+    try:
+        while True:
+            data = await websocket.receive()
+            if data["type"] == "websocket.disconnect":
+                break
+            sess.last_activity = time.time()
+            
+            if "bytes" in data:
+                chunk = data["bytes"]
+                async with sess.lock:
+                    if not sess.resumable and len(chunk) < 10: # Leak Prevention: Basic check for silence/empty chunk (minimum headers)
+                        continue
+
+                    # Checked before the reassembler takes the chunk, so nothing it releases is dropped
+                    held = sum(len(c) for c in sess.reassembler.pending.values())
+                    if sess.bytes_received + held + len(chunk) > sess.max_bytes:
+                        await websocket.send_json({"stage": "error", "message": "Size limit exceeded (100MB)"})
+                        break
+
+                    if sess.resumable:
+                        # Frames are announced by chunk_seq; unannounced ones are taken as next in order
+                        seq = sess.announced_seq if sess.announced_seq is not None else sess.reassembler.next_seq
+                        sess.announced_seq = None
+                        ready = sess.reassembler.push(seq, chunk)
+                    else:
+                        ready = [chunk]
+
+                    for piece in ready:
+                        sess.append_audio(piece)
+                    await session_manager.sync(sess)
+                    if sess.resumable:
+                        await websocket.send_json({"type": "ack", "seq": sess.reassembler.acked})
+            
+            elif "text" in data:
+                payload = json.loads(data["text"])
+                if payload.get("type") == "metadata":
+                    sess.participants = payload.get("participants", [])
+                    sess.title = payload.get("title", sess.title)
+                    sess.is_recording = True  # Mark session as actively recording
+                    sess.send_partials = bool(payload.get("partials", sess.send_partials))
+                    sess.skip_muted_audio = bool(payload.get("skip_muted_audio", sess.skip_muted_audio))
+                    if payload.get("started_at") and sess.recording_started_at is None:
+                        sess.recording_started_at = float(payload["started_at"])  # Client clock, matches mute events
+                    if payload.get("whisper_model") or payload.get("compute_type") or payload.get("profile"):
+                        try:
+                            sess.whisper_model = WhisperRegistry.resolve(
+                                payload.get("whisper_model"), payload.get("compute_type"), payload.get("profile")
+                            )
+                        except ValueError as e:
+                            logger.warning(f"Session {session_id}: {e}; keeping {sess.whisper_model}")
+                    sess.resumable = bool(payload.get("resumable", sess.resumable))
+                    sess.stream_analysis = bool(payload.get("stream_analysis", sess.stream_analysis))
+                    sess.start_streaming()
+                    await session_manager.sync(sess, force=True)
+                    if sess.resumable:
+                        # Tells a reconnecting client which chunk to re-send from (acked + 1)
+                        await websocket.send_json({
+                            "type": "resume",
+                            "seq": sess.reassembler.acked,
+                            "bytes": sess.bytes_received
+                        })
+                    logger.info(f"Session {session_id} metadata received. Recording started.")
+                elif payload.get("type") == "chunk_seq":
+                    seq = payload.get("seq")
+                    if seq is not None and sess.resumable:
+                        sess.announced_seq = int(seq)
+                    elif seq is not None:
+                        # Detect missing chunks
+                        if sess.last_seq is not None and seq != sess.last_seq + 1:
+                            logger.warning(f"Session {session_id}: Missing chunks detected. Expected {sess.last_seq + 1}, got {seq}")
+                        sess.last_seq = seq
+                elif payload.get("type") == "mute_event":
+                    mute_event = {
+                        "timestamp": payload.get("timestamp"),
+                        "muted": payload.get("muted")
+                    }
+                    sess.mute_events.append(mute_event)
+                    await session_manager.sync(sess, force=True)
+                    logger.info(f"Session {session_id}: Microphone {'muted' if mute_event['muted'] else 'unmuted'} at {mute_event['timestamp']}")
+                elif payload.get("type") == "stop":
+                    if sess.audio.size == 0 or sess.bytes_received == 0:
+                        await websocket.send_json({"stage": "error", "message": "No audio captured"})
+                        break
+
+                    if payload.get("async"):
+                        # Hand the session to a background job; the client polls /jobs/{job_id}
+                        await session_manager.remove(session_id, cleanup=False)
+                        sess.is_recording = False
+                        job_id = await asyncio.to_thread(job_store.create, "recording")
+                        start_job(job_id, functools.partial(run_session_job, sess))
+                        await websocket.send_json({"stage": "queued", "job_id": job_id})
+                        break
+
+                    # Transcription with local whisper: only the tail not yet covered by streaming windows
+                    await websocket.send_json({"stage": "transcribing"})
+                    try:
+                        transcript = await finalize_session_transcript(sess)
+                    except TranscriptionBusy as e:
+                        # Keep the session so the client can send stop again
+                        await websocket.send_json({
+                            "stage": "error",
+                            "message": str(e),
+                            "retry_after": TRANSCRIBE_RETRY_AFTER_SECONDS
+                        })
+                        break
+                    
+                    # Analysis
+                    await websocket.send_json({"stage": "analyzing"})
+                    async def send_partial(event: Dict):
+                        event = dict(event)
+                        await websocket.send_json({"stage": f"partial_{event.pop('type')}", **event})
+
+                    async with forward_events(send_partial) as on_event:
+                        result = await run_until_disconnect(websocket, analyze_transcript(
+                            transcript,
+                            json.dumps(sess.participants),
+                            on_event=on_event if sess.stream_analysis else None
+                        ))
+
+                    # Emailing
+                    await dispatch_participant_emails(result, {p['email'] for p in sess.participants})
+
+                    await websocket.send_json({"stage": "complete", "result": result.model_dump()})
+                    sess.is_finalized = True
+                    sess.is_recording = False  # Mark recording as complete
+                    break
+                
+    except WebSocketDisconnect:
+        logger.info(f"Client disconnected from session {session_id}, pending work cancelled")
+    except Exception as e:
+        logger.error(f"WebSocket error for {session_id}: {e}")
+        try:
+            await websocket.send_json({"stage": "error", "message": str(e)})
+        except: pass
+    finally:
+        if sess.websocket is websocket:
+            sess.websocket = None
+        if sess.is_finalized:
+            await session_manager.remove(session_id, cleanup=False)
+            sess.cleanup()
+        # Otherwise, keep session for 60s for possible reconnect
+        with contextlib.suppress(Exception):
+            await websocket.close()
+
+@app.post("/process-transcript", response_model=ProcessingResult)
+async def process_transcript(req: TranscriptProcessRequest):
+    try:
+        result = await analyze_transcript(req.transcript, json.dumps([p.dict() for p in req.participants]))
+        
+        # Emailing
+        await dispatch_participant_emails(result, {p.email for p in req.participants})
+        
+        return result
+    except Exception as e:
+        logger.error(f"Transcript processing failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/process-transcript/stream")
+async def process_transcript_stream(req: TranscriptProcessRequest):
+    """Like /process-transcript, but as server-sent events: `summary` and `task` as soon as the
+    model has produced them, then `complete` with the validated result (or `error`)."""
+    participants_json = json.dumps([p.dict() for p in req.participants])
+
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(analyze_transcript(req.transcript, participants_json, on_event=queue.put_nowait))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (event := await queue.get()) is not None:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            result = task.result()
+            await dispatch_participant_emails(result, {p.email for p in req.participants})
+            yield f"event: complete\ndata: {result.model_dump_json()}\n\n"
+        except Exception as e:
+            logger.error(f"Streaming transcript processing failed: {e}")
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield f"event: error\ndata: {json.dumps({'message': detail})}\n\n"
+        finally:
+            if not task.done():
+                task.cancel()  # Client went away
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+# Asynchronous jobs: submit returns a job id at once, state lives in SQLite shared by all workers
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+JOB_HEARTBEAT_SECONDS = 15
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "120"))  # No heartbeat for this long: the worker died
+JOB_BUSY_RETRIES = int(os.getenv("JOB_BUSY_RETRIES", "20"))
+
+class JobStore:
+    """Job status, progress and results in a local SQLite database (WAL mode, safe across processes).
+
+    Calls block on the database lock; from async code run them via asyncio.to_thread.
+    """
+
+    TERMINAL = ("complete", "failed")
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.db.commit()
+        self._lock = threading.Lock()
+
+    def create(self, kind: str) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self.db.execute(
+                "INSERT INTO jobs (id, kind, status, stage, created_at, updated_at) VALUES (?, ?, 'queued', 'queued', ?, ?)",
+                (job_id, kind, now, now)
+            )
+            self.db.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self.db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self.db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            cursor = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            job = dict(zip([c[0] for c in cursor.description], row))
+        if job["status"] not in self.TERMINAL and time.time() - job["updated_at"] > JOB_STALE_SECONDS:
+            job["status"] = "failed"
+            job["error"] = "Job was interrupted (worker stopped)"
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def purge(self):
+        with self._lock:
+            self.db.execute("DELETE FROM jobs WHERE updated_at < ?", (time.time() - JOB_RETENTION_SECONDS,))
+            self.db.commit()
+
+    async def purge_loop(self):
+        while True:
+            await asyncio.to_thread(self.purge)
+            await asyncio.sleep(3600)
+
+job_store = JobStore(JOBS_DB_PATH)
+background_jobs = set()  # Strong references so running job tasks are not garbage-collected
+
+def start_job(job_id: str, work):
+    """Runs `work(progress)` in the background, persisting its stage, result or error."""
+    async def runner():
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+                await asyncio.to_thread(job_store.update, job_id)
+
+        async def progress(stage: str):
+            await asyncio.to_thread(job_store.update, job_id, stage=stage)
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            await asyncio.to_thread(job_store.update, job_id, status="running")
+            result = await work(progress)
+            await asyncio.to_thread(
+                job_store.update, job_id, status="complete", stage="complete", result=result.model_dump_json()
+            )
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            await asyncio.to_thread(job_store.update, job_id, status="failed", error=str(e))
+        finally:
+            beat.cancel()
+
+    task = asyncio.create_task(runner())
+    background_jobs.add(task)
+    task.add_done_callback(background_jobs.discard)
+
+async def retry_when_busy(make_coro):
+    """Jobs wait for room in the transcription pool instead of failing fast."""
+    for attempt in range(JOB_BUSY_RETRIES):
+        try:
+            return await make_coro()
+        except TranscriptionBusy:
+            if attempt == JOB_BUSY_RETRIES - 1:
+                raise
+            await asyncio.sleep(TRANSCRIBE_RETRY_AFTER_SECONDS)
+
+async def run_session_job(sess: MeetingSession, progress) -> ProcessingResult:
+    try:
+        await progress("transcribing")
+        transcript = await retry_when_busy(lambda: finalize_session_transcript(sess))
+        await progress("analyzing")
+        result = await analyze_transcript(transcript, json.dumps(sess.participants))
+        await dispatch_participant_emails(result, {p['email'] for p in sess.participants})
+        return result
+    finally:
+        sess.cleanup()
+
+async def run_audio_job(audio: AudioBuffer, audio_hash: str, model: WhisperSpec, participants_json: str, progress) -> ProcessingResult:
+    try:
+        await progress("transcribing")
+        transcript = await retry_when_busy(lambda: transcribe_buffer(audio, audio_hash, model))
+        await progress("analyzing")
+        result = await analyze_transcript(transcript, participants_json)
+        await dispatch_participant_emails(result, {p["email"] for p in json.loads(participants_json)})
+        return result
+    finally:
+        audio.close()
+
+async def run_transcript_job(req: TranscriptProcessRequest, progress) -> ProcessingResult:
+    await progress("analyzing")
+    result = await analyze_transcript(req.transcript, json.dumps([p.dict() for p in req.participants]))
+    await dispatch_participant_emails(result, {p.email for p in req.participants})
+    return result
+
+@app.post("/jobs/transcript", status_code=202)
+async def submit_transcript_job(req: TranscriptProcessRequest):
+    job_id = await asyncio.to_thread(job_store.create, "transcript")
+    start_job(job_id, functools.partial(run_transcript_job, req))
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/jobs/audio", status_code=202)
+async def submit_audio_job(
+    file: UploadFile = File(...),
+    participants: str = Form("[]"),  # JSON list of {"name", "email"}
+    whisper_model: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None)  # fast | balanced | accurate
+):
+    try:
+        participant_list = [ParticipantInput(**p).dict() for p in json.loads(participants)]
+        model = WhisperRegistry.resolve(whisper_model, profile=profile)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Read the upload now: the request body is gone once this handler returns
+    audio, audio_hash = await read_upload(file)
+    job_id = await asyncio.to_thread(job_store.create, "audio")
+    start_job(job_id, functools.partial(run_audio_job, audio, audio_hash, model, json.dumps(participant_list)))
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events with the job state whenever its stage or status changes."""
+    if await asyncio.to_thread(job_store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+
+    async def events():
+        last = None
+        while True:
+            job = await asyncio.to_thread(job_store.get, job_id)
+            if job is None:
+                return
+            if (job["status"], job["stage"]) != last:
+                last = (job["status"], job["stage"])
+                yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] in JobStore.TERMINAL:
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# main.py opens its SQLite stores at import time; keep them out of the working tree
+_store_dir = tempfile.mkdtemp(prefix="meeting-tests-")
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(_store_dir, "jobs.sqlite3"))
+os.environ.setdefault("SESSION_DB_PATH", os.path.join(_store_dir, "sessions.sqlite3"))
+os.environ.setdefault("EMAIL_STATUS_DB_PATH", os.path.join(_store_dir, "email_status.sqlite3"))
+os.environ.setdefault("CACHE_ENABLED", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,32 @@
+import main
+
+
+def test_detach_drops_writes_the_new_owner_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "AUDIO_TEMP_DIR", str(tmp_path))
+    old = main.AudioBuffer(spill_bytes=0)
+    old.write(b"A" * 100)
+    old.flush()
+    old.write(b"X" * 50)  # Still in the old worker's write buffer
+
+    new = main.AudioBuffer.adopt(old.path, 100)
+    new.write(b"B" * 50)
+    new.flush()
+    old.detach()
+
+    with new.reader() as f:
+        assert f.read() == b"A" * 100 + b"B" * 50
+    new.close()
+
+
+def test_adopt_truncates_to_the_resumed_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "AUDIO_TEMP_DIR", str(tmp_path))
+    old = main.AudioBuffer(spill_bytes=0)
+    old.write(b"A" * 120)
+    old.flush()
+    new = main.AudioBuffer.adopt(old.path, 100)
+    old.detach()
+    assert new.size == 100
+    new.write(b"B")
+    with new.reader() as f:
+        assert f.read() == b"A" * 100 + b"B"
+    new.close()
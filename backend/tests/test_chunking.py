@@ -0,0 +1,46 @@
+import pytest
+
+import main
+
+
+class WordEncoder:
+    """One token per whitespace-separated word, so budgets in tests are easy to count."""
+
+    def encode_ordinary_batch(self, texts):
+        return [text.split() for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens) + " "
+
+
+@pytest.fixture
+def word_encoder(monkeypatch):
+    monkeypatch.setattr(main, "get_encoder", lambda model: WordEncoder())
+
+
+def sentences(n):
+    return " ".join(f"Sentence {i} has five words." for i in range(n))
+
+
+
+def test_chunk_transcript_keeps_short_text_whole(word_encoder):
+    chunks = main.chunk_transcript("Hello there. How are you?", max_tokens=50, overlap_tokens=10)
+    assert [c.text for c in chunks] == ["Hello there. How are you?"]
+    assert chunks[0].token_count == 5
+
+
+def test_chunk_transcript_respects_budget_and_overlaps(word_encoder):
+    chunks = main.chunk_transcript(sentences(20), max_tokens=22, overlap_tokens=5)
+    assert len(chunks) > 1
+    assert all(c.token_count <= 22 for c in chunks)
+    assert "Sentence 0 " in chunks[0].text
+    assert "Sentence 19 " in chunks[-1].text
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous.text.strip().rsplit("Sentence ", 1)[1]
+        assert current.text.startswith("Sentence " + last_sentence)
+
+
+def test_chunk_transcript_splits_run_on_piece(word_encoder):
+    text = " ".join(f"w{i}" for i in range(25))
+    chunks = main.chunk_transcript(text, max_tokens=10, overlap_tokens=0)
+    assert [c.token_count for c in chunks] == [10, 10, 5]
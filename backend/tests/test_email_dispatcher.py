@@ -0,0 +1,54 @@
+import asyncio
+
+import main
+
+
+class FlakyTransport(main.EmailTransport):
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.sent = []
+
+    def send(self, summary, participants):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("smtp down")
+        self.sent.append([p.email for p in participants])
+
+
+def participants():
+    task = [main.Task(task="Send the report")]
+    return [
+        main.Participant(name="Ana", email="ana@example.com", tasks=task),
+        main.Participant(name="Bo", email="bo@example.com", tasks=task),
+        main.Participant(name="Cy", email="cy@example.com"),
+    ]
+
+
+def run_dispatch(tmp_path, monkeypatch, failures: int, max_retries: int):
+    monkeypatch.setattr(main, "EMAIL_RETRY_BASE_SECONDS", 0)
+    transport = FlakyTransport(failures)
+    path = str(tmp_path / "email_status.sqlite3")
+    dispatcher = main.EmailDispatcher(transport, main.EmailStatusStore(path), 1, 1, max_retries)
+
+    async def scenario():
+        worker = asyncio.create_task(dispatcher._worker())
+        dispatch_id = await dispatcher.submit("Summary", participants())
+        await dispatcher.queue.join()
+        worker.cancel()
+        return dispatch_id
+
+    dispatch_id = asyncio.run(scenario())
+    # Another worker process reads the same database
+    return transport, main.EmailStatusStore(path).get(dispatch_id)
+
+
+def test_dispatcher_retries_until_sent(tmp_path, monkeypatch):
+    transport, statuses = run_dispatch(tmp_path, monkeypatch, failures=2, max_retries=2)
+    assert transport.sent == [["ana@example.com"], ["bo@example.com"]]
+    assert statuses == {"ana@example.com": "sent", "bo@example.com": "sent"}
+
+
+def test_dispatcher_marks_failed_after_the_last_retry(tmp_path, monkeypatch):
+    transport, statuses = run_dispatch(tmp_path, monkeypatch, failures=3, max_retries=2)
+    assert transport.sent == [["bo@example.com"]]
+    assert statuses == {"ana@example.com": "failed", "bo@example.com": "sent"}
@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Sure! Here it is: {"a": [1, 2,],} Hope this helps.', {"a": [1, 2]}),
+    ('{"a": {"b": "unfinished', {"a": {"b": "unfinished"}}),
+    ('{"a": 1, "b":', {"a": 1, "b": None}),
+])
+def test_repair_json(content, expected):
+    assert main.repair_json(content) == expected
+
+
+def test_repair_json_gives_up_without_an_object():
+    assert main.repair_json("I could not find any tasks.") is None
+    assert main.repair_json('["not", "an", "object"]') is None
+
+
+def test_close_json_ignores_brackets_inside_strings():
+    assert json.loads(main._close_json('{"a": "[{", "b": [1')) == {"a": "[{", "b": [1]}
+
+
+def test_parse_llm_json_rejects_non_objects():
+    with pytest.raises(main.HTTPException):
+        main.parse_llm_json('["a", "list"]')
+    assert main.parse_llm_json('{"a": 1}') == {"a": 1}
+
+
+def test_llm_json_reasks_when_the_reply_is_not_an_object(monkeypatch):
+    replies = iter(['["not", "an", "object"]', '{"meeting_summary": "Fixed", "participants": []}'])
+    prompts = []
+
+    async def fake_chat(messages, **kwargs):
+        prompts.append(messages)
+        return next(replies)
+    monkeypatch.setattr(main, "llm_chat", fake_chat)
+
+    result = asyncio.run(main.llm_json([], main.AnalysisOutput))
+    assert result == {"meeting_summary": "Fixed", "participants": []}
+    assert "not a JSON object" in prompts[1][1]["content"]
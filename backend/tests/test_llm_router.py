@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+
+
+def connection_error(url):
+    return main.APIConnectionError(message=f"{url} refused", request=httpx.Request("POST", url))
+
+
+@pytest.fixture
+def router(monkeypatch):
+    def make(*urls, fail=None):
+        router = main.LlmRouter(list(urls), 1)
+        calls = []
+
+        async def fake_chat_on(backend, messages, timeout, on_delta, model, **kwargs):
+            calls.append(backend.base_url)
+            if fail(backend.base_url, len(calls)):
+                raise connection_error(backend.base_url)
+            backend.record_success(0.01)
+            return f"reply from {backend.base_url}"
+
+        monkeypatch.setattr(main, "llm_router", router)
+        monkeypatch.setattr(main, "_llm_chat_on", fake_chat_on)
+        monkeypatch.setattr(main, "LLM_RETRY_BACKOFF_SECONDS", 0.0)
+        return router, calls
+    return make
+
+
+def test_fails_over_and_ejects_a_broken_backend(router):
+    llm_router, calls = router("http://a/v1", "http://b/v1", fail=lambda url, n: url == "http://a/v1")
+    broken = llm_router.backends[0]
+    for _ in range(main.LLM_EJECT_AFTER_FAILURES):
+        broken.latency = 0.0  # Keep the broken backend first in line
+        llm_router.backends[1].latency = 1.0
+        assert asyncio.run(main.llm_chat([])) == "reply from http://b/v1"
+    assert broken.ejected
+    assert calls == ["http://a/v1", "http://b/v1"] * main.LLM_EJECT_AFTER_FAILURES
+
+    calls.clear()
+    assert asyncio.run(main.llm_chat([])) == "reply from http://b/v1"
+    assert calls == ["http://b/v1"]
+
+
+def test_single_backend_retries_transient_errors(router):
+    llm_router, calls = router("http://a/v1", fail=lambda url, n: n <= main.LLM_RETRY_ROUNDS)
+    assert asyncio.run(main.llm_chat([])) == "reply from http://a/v1"
+    assert len(calls) == main.LLM_RETRY_ROUNDS + 1
+    assert not llm_router.backends[0].ejected  # The success puts it back
+
+
+def test_gives_up_after_the_retry_rounds(router):
+    _, calls = router("http://a/v1", "http://b/v1", fail=lambda url, n: True)
+    with pytest.raises(main.APIConnectionError):
+        asyncio.run(main.llm_chat([]))
+    assert len(calls) == 2 * (main.LLM_RETRY_ROUNDS + 1)
+
+
+def test_acquire_waits_on_an_ejected_backend_with_nowhere_else_to_go():
+    async def scenario():
+        backend = main.LlmBackend("http://a/v1", 1)
+        await backend.semaphore.acquire()
+        backend.ejected = True
+        assert not await backend.acquire(lambda: True)
+        asyncio.get_running_loop().call_later(1.2, backend.semaphore.release)
+        assert await backend.acquire(lambda: False)
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import main
+
+
+def test_merge_chunk_tasks_assigns_and_deduplicates():
+    participants = json.dumps([
+        {"name": "Ana", "email": "ana@example.com"},
+        {"name": "Bo", "email": "Bo@Example.com"},
+    ])
+    partials = [
+        {"tasks": [
+            {"owner": "Ana", "task": "Send the report.", "deadline": None},
+            {"owner": "bo@example.com", "task": "Book room", "deadline": "Mon"},
+            {"owner": "Carl", "task": "Unknown owner"},
+        ]},
+        {"tasks": [
+            {"owner": "ana@example.com", "task": "send the REPORT", "deadline": "Tue"},
+            {"owner": "Ana", "task": ""},
+            "not a task",
+        ]},
+    ]
+    merged = main.merge_chunk_tasks(partials, participants)
+    assert merged == [
+        {"name": "Ana", "email": "ana@example.com", "tasks": [{"task": "Send the report.", "deadline": "Tue"}]},
+        {"name": "Bo", "email": "Bo@Example.com", "tasks": [{"task": "Book room", "deadline": "Mon"}]},
+    ]
+
+
+def test_map_reduce_streams_chunk_tasks_and_the_summary(monkeypatch):
+    participants = json.dumps([{"name": "Ana", "email": "ana@example.com"}])
+    events = []
+
+    async def fake_llm_json(messages, schema, on_delta=None, model=None):
+        if schema is main.ReduceOutput:
+            # Every chunk's tasks are out before the reduce call starts
+            assert [e["type"] for e in events] == ["task"]
+            reply = '{"meeting_summary": "Ana sends the report."}'
+            for i in range(0, len(reply), 7):
+                on_delta(reply[i:i + 7])
+            return json.loads(reply)
+        return {
+            "summary_points": ["report discussed"],
+            "tasks": [{"owner": "Ana", "task": "Send the report", "deadline": None}],
+        }
+
+    monkeypatch.setattr(main, "llm_json", fake_llm_json)
+    chunks = [main.TranscriptChunk(text=t, token_count=1) for t in ("one", "two")]
+    result = asyncio.run(main.map_reduce_analysis(chunks, participants, events.append))
+
+    assert events == [
+        {"type": "task", "participant": "Ana", "email": "ana@example.com",
+         "task": "Send the report", "deadline": None},
+        {"type": "summary", "text": "Ana sends the report."},
+    ]
+    assert result["meeting_summary"] == "Ana sends the report."
@@ -0,0 +1,9 @@
+import main
+
+
+def test_annotate_transcript_places_markers_by_time():
+    segments = [(0.0, 2.0, " one"), (3.0, 5.0, " two "), (9.0, 11.0, "three")]
+    muted = [(2.5, 8.0), (12.0, float("inf"))]
+    assert list(main.annotate_transcript(iter(segments), muted)) == [
+        "one", "[Microphone Muted]", "two", "[Microphone Unmuted]", "three", "[Microphone Muted]",
+    ]
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import main
+
+
+def test_pcm_buffer_grows_and_discards_transcribed_samples():
+    pcm = main.PcmBuffer(initial_seconds=1)
+    rate = main.WHISPER_SAMPLE_RATE
+    pcm.append(np.arange(rate, dtype=np.int16))
+    pcm.append(np.full(rate, 7, dtype=np.int16))
+    assert pcm.seconds == 2.0
+    early = pcm.to_float32(rate - 2, rate + 2)
+    assert (early * 32768).astype(int).tolist() == [rate - 2, rate - 1, 7, 7]
+
+    pcm.discard_before(rate + 10)
+    assert pcm.base == rate + 10
+    assert len(pcm.to_float32(rate + 10)) == rate - 10
+    with pytest.raises(ValueError):
+        pcm.to_float32(rate)
+    # Views taken before the discard still hold their samples
+    assert (early * 32768).astype(int).tolist() == [rate - 2, rate - 1, 7, 7]
+
+    pcm.append(np.full(5, 3, dtype=np.int16))
+    assert pcm.samples == 2 * rate + 5
+    assert (pcm.to_float32(2 * rate - 1) * 32768).astype(int).tolist() == [7, 3, 3, 3, 3, 3]
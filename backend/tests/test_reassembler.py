@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_reassembler_orders_and_drops_duplicates():
+    r = main.ChunkReassembler(window=4)
+    assert r.push(2, b"b") == []
+    assert r.push(1, b"a") == [b"a", b"b"]
+    assert r.push(1, b"a") == []
+    assert r.push(3, b"c") == [b"c"]
+    assert r.acked == 3
+
+
+def test_reassembler_skips_gap_when_window_overflows():
+    r = main.ChunkReassembler(window=2)
+    assert r.push(2, b"b") == []
+    assert r.push(3, b"c") == []
+    assert r.push(4, b"d") == [b"b", b"c", b"d"]
+    assert r.acked == 4
+    assert r.push(1, b"a") == []
+
+
+def test_size_limit_is_checked_before_the_reassembler_releases_chunks(monkeypatch):
+    monkeypatch.setattr(main, "MAX_AUDIO_BYTES", 20)
+    client = TestClient(main.app)
+    with client.websocket_connect("/ws/record/size-limit") as ws:
+        ws.send_json({"type": "metadata", "resumable": True})
+        assert ws.receive_json()["type"] == "resume"
+        ws.send_json({"type": "chunk_seq", "seq": 2})
+        ws.send_bytes(b"b" * 12)
+        assert ws.receive_json() == {"type": "ack", "seq": 0}
+        ws.send_json({"type": "chunk_seq", "seq": 1})
+        ws.send_bytes(b"a" * 12)
+        assert ws.receive_json()["stage"] == "error"
+
+    sess = main.session_manager.sessions["size-limit"]
+    # The early chunk is still held rather than popped and thrown away
+    assert sess.bytes_received == 0
+    assert sess.reassembler.pending == {2: b"b" * 12}
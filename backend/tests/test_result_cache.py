@@ -0,0 +1,45 @@
+import asyncio
+
+import main
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_memory_tier_evicts_least_recently_used_past_its_budget():
+    cache = main.ResultCache(ttl=60, max_memory_bytes=10)
+    run(cache.set("t:a", "aaaa"))
+    run(cache.set("t:b", "bbbb"))
+    assert run(cache.get("t:a")) == "aaaa"  # Now b is the least recently used
+    run(cache.set("t:c", "cccc"))
+    assert run(cache.get("t:b")) is None
+    assert run(cache.get("t:a")) == "aaaa"
+    assert cache.memory_bytes == 8
+    assert cache.stats()["hits"] == {"t": 2} and cache.stats()["misses"] == {"t": 1}
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    cache = main.ResultCache(ttl=60, max_memory_bytes=100)
+    run(cache.set("t:a", "value"))
+    later = main.time.time() + 61
+    monkeypatch.setattr(main.time, "time", lambda: later)
+    assert run(cache.get("t:a")) is None
+
+
+def test_disk_tier_refills_memory_and_evicts_by_last_access(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(main.time, "time", lambda: clock[0])
+    cache = main.ResultCache(ttl=3600, max_memory_bytes=4, db_path=str(tmp_path / "cache.sqlite3"), max_disk_bytes=8)
+    for key in ("t:a", "t:b"):
+        clock[0] += 1
+        run(cache.set(key, "xxxx"))
+    clock[0] += 1
+    assert run(cache.get("t:a")) == "xxxx"  # From disk; its access time is saved by the next set
+    clock[0] += 1
+    run(cache.set("t:c", "xxxx"))  # Over the disk cap: b is the least recently used
+    cache.memory.clear()
+    cache.memory_bytes = 0
+    assert run(cache.get("t:b")) is None
+    assert run(cache.get("t:a")) == "xxxx"
+    assert run(cache.get("t:c")) == "xxxx"
@@ -0,0 +1,44 @@
+import asyncio
+
+import main
+
+
+class RecordingStore(main.SessionStore):
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, session_id):
+        self.deleted.append(session_id)
+
+
+def test_expire_removes_only_sessions_past_their_deadline():
+    async def scenario():
+        store = RecordingStore()
+        manager = main.SessionManager(store)
+        stale = await manager.get_or_create("stale")
+        fresh = await manager.get_or_create("fresh")
+        now = stale.last_activity + main.SESSION_IDLE_TIMEOUT_SECONDS + 1
+        fresh.last_activity = now - 10  # Active since it was queued
+
+        await manager.expire(now)
+        assert list(manager.sessions) == ["fresh"]
+        assert store.deleted == ["stale"]
+        # The fresh session was re-queued for its new deadline
+        await manager.expire(now + main.SESSION_IDLE_TIMEOUT_SECONDS)
+        assert manager.sessions == {}
+        fresh.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_recording_sessions_get_the_longer_timeout():
+    async def scenario():
+        manager = main.SessionManager(RecordingStore())
+        sess = await manager.get_or_create("recording")
+        sess.is_recording = True
+        await manager.expire(sess.last_activity + main.SESSION_IDLE_TIMEOUT_SECONDS + 1)
+        assert "recording" in manager.sessions
+        await manager.remove("recording")
+        assert manager.sessions == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+import numpy as np
+
+import main
+
+
+def test_plan_shards_moves_cuts_into_silence():
+    rate = main.WHISPER_SAMPLE_RATE
+    audio = np.random.default_rng(0).uniform(-0.5, 0.5, 300 * rate).astype(np.float32)
+    audio[int(104 * rate):int(105 * rate)] = 0  # Silence near the 100 s cut
+    bounds = main.plan_shards(audio, 3)
+    assert len(bounds) == 3
+    assert bounds[0][0] == 0.0 and bounds[-1][1] == 300.0
+    assert 104.0 <= bounds[0][1] <= 105.0
+    assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+
+
+def test_transcribe_shard_keeps_segments_centred_inside_it(monkeypatch):
+    calls = []
+
+    def fake_window(window, offset, final, model, excluded=()):
+        calls.append((len(window) / main.WHISPER_SAMPLE_RATE, offset))
+        # Recording-time segments around the 10 s and 20 s seams
+        return [(8.0, 11.0, "a"), (11.0, 12.0, "b"), (19.0, 22.0, "c")], offset
+    monkeypatch.setattr(main, "transcribe_window", fake_window)
+    monkeypatch.setattr(main, "SHARD_OVERLAP_SECONDS", 2.0)
+
+    audio = np.zeros(30 * main.WHISPER_SAMPLE_RATE, dtype=np.float32)
+    kept = main.transcribe_shard(audio, 0.0, 10.0, 20.0, None)
+    assert calls == [(14.0, 8.0)]
+    assert kept == [(11.0, 12.0, "b")]
+    # The seam segments each land in exactly one neighbour
+    assert main.transcribe_shard(audio, 0.0, 0.0, 10.0, None) == [(8.0, 11.0, "a")]
+    assert main.transcribe_shard(audio, 0.0, 20.0, 30.0, None) == [(19.0, 22.0, "c")]
@@ -0,0 +1,15 @@
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("spans, excluded, expected", [
+    ([(0, 10)], [], [(0, 10)]),
+    ([(0, 10)], [(2, 4)], [(0, 2), (4, 10)]),
+    ([(0, 10)], [(6, 8), (1, 3)], [(0, 1), (3, 6), (8, 10)]),
+    ([(0, 5), (7, 9)], [(4, 8)], [(0, 4), (8, 9)]),
+    ([(2, 4)], [(0, 10)], []),
+    ([(0, 5)], [(5, 6)], [(0, 5)]),
+])
+def test_subtract_spans(spans, excluded, expected):
+    assert main.subtract_spans(spans, excluded) == expected
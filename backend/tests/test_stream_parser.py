@@ -0,0 +1,38 @@
+import json
+
+import main
+
+
+def test_stream_parser_reports_values_as_they_complete():
+    reply = {
+        "meeting_summary": "We agreed on \"the plan\".",
+        "participants": [
+            {"name": "Ana", "email": "ana@example.com", "tasks": [{"task": "Write spec", "deadline": "Friday"}]},
+            {"name": "Bo", "email": "bo@example.com", "tasks": [{"task": "Review", "deadline": None}]},
+        ],
+    }
+    text = json.dumps(reply)
+    events = []
+    parser = main.analysis_stream_parser(events.append)
+    summary_done_at = None
+    for i, c in enumerate(text):
+        parser.feed(c)
+        if events and summary_done_at is None:
+            summary_done_at = i
+    assert summary_done_at < text.index("participants")
+    assert events == [
+        {"type": "summary", "text": "We agreed on \"the plan\"."},
+        {"type": "task", "participant": "Ana", "email": "ana@example.com", "task": "Write spec", "deadline": "Friday"},
+        {"type": "task", "participant": "Bo", "email": "bo@example.com", "task": "Review", "deadline": None},
+    ]
+
+
+def test_incremental_parser_paths():
+    values = []
+    parser = main.IncrementalJsonParser(lambda path, raw: values.append((path, raw)))
+    parser.feed('{"a": [1, "x", {"b": "y"}],')
+    parser.feed(' "c": "z"}')
+    assert (("a", 1), '"x"') in values
+    assert (("a", 2, "b"), '"y"') in values
+    assert (("c",), '"z"') in values
+    assert values[-1][0] == ()
@@ -0,0 +1,12 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_uploads_over_the_size_limit_are_rejected(monkeypatch):
+    monkeypatch.setattr(main, "MAX_AUDIO_BYTES", 10)
+    client = TestClient(main.app)
+    response = client.post("/transcribe", files={"file": ("meeting.webm", b"x" * 11, "audio/webm")})
+    assert response.status_code == 413
+    response = client.post("/jobs/audio", files={"file": ("meeting.webm", b"x" * 11, "audio/webm")})
+    assert response.status_code == 413
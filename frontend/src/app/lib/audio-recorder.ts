@@ -28,6 +28,7 @@ export class DuplexAudioRecorder {
   private chunkBuffer: Blob[] = [];
   private maxBufferSize: number = 50; // ~50 seconds of audio
   private sequenceNumber: number = 0;
+  private recordingStartedAt: number | null = null; // Client clock, same as mute event timestamps
 
   // Session info for reconnection
   private sessionId: string = "";
@@ -123,12 +124,18 @@ export class DuplexAudioRecorder {
         this.setConnectionState("connected");
         this.reconnectAttempts = 0;
 
+        // The recorder starts right below on first connect; reconnects keep the original time
+        if (this.recordingStartedAt === null) {
+          this.recordingStartedAt = Date.now();
+        }
+
         // Send initial metadata
         this.ws?.send(
           JSON.stringify({
             type: "metadata",
             title: this.meetingTitle,
             participants: this.meetingParticipants,
+            started_at: this.recordingStartedAt,
           }),
         );
 
@@ -335,5 +342,6 @@ export class DuplexAudioRecorder {
     this.chunkBuffer = [];
     this.reconnectAttempts = 0;
     this.sequenceNumber = 0;
+    this.recordingStartedAt = null;
   }
 }